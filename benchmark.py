@@ -0,0 +1,142 @@
+"""Job store and engine routing benchmarks.
+
+Reports retained bytes per JobRecord (as built, and after a persist and a
+listing pass have run) and the throughput of the job listing
+and job status endpoints for a store of N jobs (1M by default). With
+``--routing`` it instead pushes jobs through the engine registry using fake
+engines and reports how work was spread across them.
+
+    python benchmark.py --jobs 1000000 --requests 200
+    python benchmark.py --routing --jobs 2000
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+import jobs
+import routes
+from engines import EngineRegistry, FakeEngine
+from jobs import JobRecord, JobStatus, JobStore
+from logger import get_logger
+
+STATUSES = (JobStatus.PENDING, JobStatus.PROCESSING, JobStatus.SUCCESS, JobStatus.FAILED)
+
+
+def build_store(count: int, storage_dir: Path) -> JobStore:
+    store = JobStore(storage_dir)
+    now = time.time() - count
+    for i in range(count):
+        status = STATUSES[i % len(STATUSES)]
+        job_id = str(uuid.uuid4())
+        store._jobs[job_id] = JobRecord(
+            job_id=job_id,
+            status=status,
+            source_format="docx" if i % 2 else "pdf",
+            target_format="pdf" if i % 2 else "docx",
+            input_filename=f"document-{i}.docx",
+            created_at=now + i,
+            started_at=now + i if status is not JobStatus.PENDING else None,
+            completed_at=now + i + 1 if status in (JobStatus.SUCCESS, JobStatus.FAILED) else None,
+        )
+    return store
+
+
+async def time_requests(label: str, count: int, make_call) -> None:
+    start = time.perf_counter()
+    for _ in range(count):
+        await make_call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {count / elapsed:>10.1f} req/s  ({elapsed / count * 1000:.3f} ms/req)")
+
+
+async def run(job_count: int, request_count: int, limit: int, storage_dir: Path) -> None:
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    store = build_store(job_count, storage_dir)
+    built, _ = tracemalloc.get_traced_memory()
+
+    # Steady state: the store has been written to disk and listed at least once.
+    jobs._job_store = store
+    await store._persist()
+    await routes.list_jobs(status=None, limit=limit, _="")
+    gc.collect()
+    steady, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"jobs={job_count} | bytes/record built={(built - before) / job_count:.1f} "
+        f"| after persist+list={(steady - before) / job_count:.1f}"
+    )
+
+    job_id = next(iter(store._jobs))
+
+    await time_requests(
+        f"list_jobs limit={limit}", request_count,
+        lambda: routes.list_jobs(status=None, limit=limit, _=""),
+    )
+    await time_requests(
+        "list_jobs status=SUCCESS", max(1, request_count // 10),
+        lambda: routes.list_jobs(status="SUCCESS", limit=limit, _=""),
+    )
+    await time_requests(
+        "get_job", request_count * 10,
+        lambda: routes.get_job(job_id, _=""),
+    )
+
+
+async def run_routing(job_count: int, concurrency: int) -> None:
+    get_logger().setLevel(logging.ERROR)
+    registry = EngineRegistry(fallback=True, health_check_seconds=60)
+    registry.register(FakeEngine("fast", {("docx", "pdf")}, latency=0.01, max_concurrent=2))
+    registry.register(FakeEngine("wide", {("docx", "pdf")}, latency=0.04, max_concurrent=8))
+    registry.register(FakeEngine("flaky", {("docx", "pdf")}, latency=0.005, failure_rate=0.3))
+    registry.register(FakeEngine("down", {("docx", "pdf")}, healthy=False))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.docx"
+        input_path.write_bytes(b"")
+        pending = iter(range(job_count))
+        failures = 0
+
+        async def worker() -> None:
+            nonlocal failures
+            for i in pending:
+                try:
+                    await registry.run("docx", ["pdf"], input_path, Path(tmp) / str(i))
+                except Exception:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    print(f"jobs={job_count} | concurrency={concurrency} | {job_count / elapsed:.1f} jobs/s | failed={failures}")
+    for stats in registry.stats():
+        print(
+            f"  {stats['name']:<8} completed={stats['completed']:<6} failed={stats['failed']:<5} "
+            f"latency={stats['latency_ewma_s']} success={stats['success_rate']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--routing", action="store_true", help="benchmark engine routing")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    if args.routing:
+        asyncio.run(run_routing(args.jobs, args.concurrency))
+    else:
+        with tempfile.TemporaryDirectory(prefix="docustream-bench-") as storage_dir:
+            asyncio.run(run(args.jobs, args.requests, args.limit, Path(storage_dir)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""Offline bulk conversion without the HTTP API.
+
+Walks a directory tree (or reads a manifest of paths) and converts every
+matching document in parallel across all cores, using the same converter
+engines as the server. Files whose outputs are newer than the source are
+skipped, and every result is appended to a checkpoint file so an interrupted
+run resumes where it stopped.
+
+    python bulk.py ./archive --to pdf --to txt --out ./converted
+    python bulk.py ./archive --manifest files.txt --to docx --out ./converted
+    python bulk.py ./archive --to pdf --pages 1-2 --out ./previews
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
+from converter import normalize_page_range, output_name, purge_soffice_profiles
+from engines import get_engine_registry
+from logger import get_logger
+from storage import StorageManager
+
+SOURCE_FORMATS = {".docx": "docx", ".pdf": "pdf"}
+PROGRESS_INTERVAL_SECONDS = 5
+
+
+def _iter_tree(root: Path, exclude: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if Path(dirpath) / d != exclude)
+        for filename in sorted(filenames):
+            yield Path(dirpath) / filename
+
+
+def _iter_manifest(root: Path, manifest: Path) -> Iterator[Path]:
+    with open(manifest, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield root / line
+
+
+def _checkpoint_key(path: str, targets, page_range: str | None) -> tuple:
+    return path, tuple(targets), page_range
+
+
+def _load_checkpoint(path: Path) -> dict[tuple, dict]:
+    """Latest entry per ``(path, targets, page range)``."""
+    entries = {}
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                key = _checkpoint_key(
+                    entry["path"], entry.get("targets", ()), entry.get("page_range")
+                )
+                entries[key] = entry
+    return entries
+
+
+def _init_worker() -> None:
+    get_logger().setLevel(logging.ERROR)
+
+
+def _convert_one(
+    source_path: str,
+    source: str,
+    targets: list[str],
+    output_dir: str,
+    scratch_root: str,
+    page_range: str | None = None,
+) -> tuple[str, list[str]]:
+    """Run in a worker process; returns ``(engine name, output paths)``."""
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    storage = StorageManager(output_path, scratch_root)
+    scratch_dir = storage.scratch_dir(Path(source_path).stem)
+    try:
+        engine, scratch_files = get_engine_registry().run_sync(
+            source, targets, Path(source_path), scratch_dir, page_range
+        )
+        committed = storage.commit_outputs(scratch_files, output_path)
+    finally:
+        storage.discard_scratch(scratch_dir)
+    return engine, [str(path) for path in committed.values()]
+
+
+class BulkConverter:
+    def __init__(
+        self,
+        root: Path,
+        out_dir: Path,
+        targets: list[str],
+        checkpoint: Path,
+        workers: int,
+        retry_failed: bool = False,
+        force: bool = False,
+        page_range: str | None = None,
+    ):
+        self.root = root
+        self.out_dir = out_dir
+        self.targets = targets
+        self.page_range = page_range
+        self.checkpoint_path = checkpoint
+        self.workers = workers
+        self.retry_failed = retry_failed
+        self.force = force
+        self.scratch_root = out_dir / ".scratch"
+        self.checkpoint = _load_checkpoint(checkpoint)
+        self.counts = Counter()
+        self.engines = Counter()
+        self.errors = Counter()
+        self.started = time.monotonic()
+        self._last_progress = self.started
+
+    def _plan(self, source_path: Path) -> tuple[str, Path] | None:
+        """Return ``(source format, output dir)``, or None when the file is skipped."""
+        source = SOURCE_FORMATS.get(source_path.suffix.lower())
+        if source is None or not get_engine_registry().supports(source, self.targets, self.page_range):
+            return None
+
+        relative = source_path.relative_to(self.root)
+        output_dir = self.out_dir / relative.parent
+        if self.force:
+            return source, output_dir
+
+        stat = source_path.stat()
+        previous = self.checkpoint.get(
+            _checkpoint_key(str(relative), self.targets, self.page_range)
+        )
+        if previous and previous["mtime"] == stat.st_mtime and previous["size"] == stat.st_size:
+            if previous["status"] == "failed" and not self.retry_failed:
+                self.counts["skipped"] += 1
+                return None
+
+        outputs = [
+            output_dir / output_name(t, source_path.stem, self.page_range) for t in self.targets
+        ]
+        if all(o.exists() and o.stat().st_mtime >= stat.st_mtime for o in outputs):
+            self.counts["skipped"] += 1
+            return None
+        return source, output_dir
+
+    def _record(self, checkpoint_file, source_path: Path, status: str, **extra) -> None:
+        stat = source_path.stat()
+        if source_path.is_relative_to(self.root):
+            path = str(source_path.relative_to(self.root))
+        else:
+            path = str(source_path)
+        entry = {
+            "path": path,
+            "targets": self.targets,
+            "page_range": self.page_range,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "status": status,
+            **extra,
+        }
+        checkpoint_file.write(json.dumps(entry) + "\n")
+        checkpoint_file.flush()
+        self.counts[status] += 1
+
+    def _progress(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_progress = now
+        elapsed = now - self.started
+        done = self.counts["converted"] + self.counts["failed"]
+        print(
+            f"[{elapsed:7.1f}s] converted={self.counts['converted']} failed={self.counts['failed']} "
+            f"skipped={self.counts['skipped']} | {done / elapsed if elapsed else 0:.1f} files/s",
+            flush=True,
+        )
+
+    def run(self, sources: Iterator[Path]) -> int:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        max_in_flight = self.workers * 4
+        in_flight = {}
+
+        with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint_file, \
+                ProcessPoolExecutor(self.workers, initializer=_init_worker) as pool:
+
+            def drain() -> None:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_path = in_flight.pop(future)
+                    try:
+                        engine, outputs = future.result()
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {str(e)}"
+                        self.errors[error[:200]] += 1
+                        self._record(checkpoint_file, source_path, "failed", error=error)
+                    else:
+                        self.engines[engine] += 1
+                        self._record(checkpoint_file, source_path, "converted", engine=engine, outputs=outputs)
+                self._progress()
+
+            for source_path in sources:
+                # normpath rather than resolve(): symlinks inside the tree stay valid
+                source_path = Path(os.path.normpath(source_path))
+                if not source_path.is_file():
+                    continue
+                if not source_path.is_relative_to(self.root):
+                    error = "Path is outside the source root"
+                    self.errors[error] += 1
+                    self._record(checkpoint_file, source_path, "failed", error=error)
+                    continue
+                plan = self._plan(source_path)
+                if plan is None:
+                    continue
+                source, output_dir = plan
+                future = pool.submit(
+                    _convert_one, str(source_path), source, self.targets,
+                    str(output_dir), str(self.scratch_root), self.page_range,
+                )
+                in_flight[future] = source_path
+                if len(in_flight) >= max_in_flight:
+                    drain()
+
+            while in_flight:
+                drain()
+
+        purge_soffice_profiles()
+        self._summary()
+        return 1 if self.counts["failed"] else 0
+
+    def _summary(self) -> None:
+        self._progress(force=True)
+        elapsed = time.monotonic() - self.started
+        print(
+            f"Done in {elapsed:.1f}s | converted={self.counts['converted']} "
+            f"failed={self.counts['failed']} skipped={self.counts['skipped']}"
+        )
+        if self.engines:
+            print("Engines: " + ", ".join(f"{name}={count}" for name, count in self.engines.most_common()))
+        if self.errors:
+            print("Top failures:")
+            for error, count in self.errors.most_common(10):
+                print(f"  {count:>6}  {error}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-convert documents on local disk.")
+    parser.add_argument("root", type=Path, help="directory to convert (manifest paths are relative to it)")
+    parser.add_argument("--to", dest="targets", action="append", required=True,
+                        help="target format; repeat for multi-target export")
+    parser.add_argument("--out", type=Path, required=True, help="output directory (mirrors the source tree)")
+    parser.add_argument("--manifest", type=Path, help="file listing one source path per line")
+    parser.add_argument("--pages", help="convert only these pages, e.g. 1-3,5 (PDF and DOCX output)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--checkpoint", type=Path, help="default: <out>/.bulk-checkpoint.jsonl")
+    parser.add_argument("--retry-failed", action="store_true", help="retry files that failed in an earlier run")
+    parser.add_argument("--force", action="store_true", help="convert even if outputs are up to date")
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    out_dir = args.out.resolve()
+    targets = list(dict.fromkeys(args.targets))
+    try:
+        page_range = normalize_page_range(args.pages) if args.pages else None
+    except ValueError as e:
+        parser.error(str(e))
+    converter = BulkConverter(
+        root,
+        out_dir,
+        targets,
+        args.checkpoint or out_dir / ".bulk-checkpoint.jsonl",
+        max(1, args.workers),
+        retry_failed=args.retry_failed,
+        force=args.force,
+        page_range=page_range,
+    )
+    sources = _iter_manifest(root, args.manifest) if args.manifest else _iter_tree(root, out_dir)
+    return converter.run(sources)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
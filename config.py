@@ -5,12 +5,22 @@ from pathlib import Path
 class Settings(BaseSettings):
     api_key: str = "change-me-to-at-least-32-chars-long"
     storage_dir: str = "./data"
+    scratch_dir: str = ""
     max_file_size_mb: int = 50
     max_concurrent_tasks: int = 4
     max_queue_length: int = 100
     job_ttl_seconds: int = 3600
+    upload_chunk_size_mb: int = 8
+    upload_ttl_seconds: int = 86400
+    gc_interval_seconds: int = 300
     log_level: str = "INFO"
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: int = 50
+    loop_block_threshold_ms: int = 100
     soffice_path: str = ""
+    soffice_python_path: str = ""
+    engine_fallback_enabled: bool = True
+    engine_health_check_seconds: int = 60
 
     class Config:
         env_file = ".env"
@@ -19,6 +29,10 @@ class Settings(BaseSettings):
     @property
     def storage_path(self) -> Path:
         return Path(self.storage_dir)
+    
+    @property
+    def scratch_path(self) -> Path | None:
+        return Path(self.scratch_dir) if self.scratch_dir else None
 
 
 _settings: Settings | None = None
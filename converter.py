@@ -1,17 +1,39 @@
+import importlib.util
+import json
+import os
+import signal
 import subprocess
 import shutil
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from exceptions import ConversionError
 from config import get_settings
 from logger import get_logger
+from storage import _pid_alive
 
 logger = get_logger()
 
+SOFFICE_TIMEOUT_SECONDS = 120
+SOFFICE_PROFILE_ROOT = Path(tempfile.gettempdir()) / "docustream-lo-profiles"
+
 try:
     import winreg
 except ImportError:
     winreg = None
 
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
+WORD_APP_PATHS = (
+    Path("/Applications/Microsoft Word.app"),
+    Path.home() / "Applications" / "Microsoft Word.app",
+)
+
 
 def _find_soffice_path() -> Path | None:
     settings = get_settings()
@@ -53,10 +75,116 @@ def _find_soffice_path() -> Path | None:
     return None
 
 
-def convert_docx_to_pdf(input_path: Path, output_dir: Path) -> Path:
-    output_dir.mkdir(parents=True, exist_ok=True)
-    output_file = output_dir / f"{input_path.stem}.pdf"
+@dataclass(frozen=True)
+class SofficeExport:
+    extension: str
+    filter_name: str
+    filter_data: dict = field(default_factory=dict)
+    filter_options: str = ""
+    suffix: str = ""
     
+    def output_name(self, stem: str) -> str:
+        return f"{stem}{self.suffix}.{self.extension}"
+    
+    def with_page_range(self, page_range: str) -> "SofficeExport":
+        return replace(self, filter_data={**self.filter_data, "PageRange": page_range})
+    
+    def convert_to(self) -> str:
+        """Filter spec for ``soffice --convert-to``."""
+        spec = f"{self.extension}:{self.filter_name}"
+        if self.filter_data:
+            spec += ":" + json.dumps({
+                key: {"type": "long" if isinstance(value, int) else "string", "value": str(value)}
+                for key, value in self.filter_data.items()
+            })
+        elif self.filter_options:
+            spec += f":{self.filter_options}"
+        return spec
+
+
+SOFFICE_EXPORTS: dict[str, SofficeExport] = {
+    "pdf": SofficeExport("pdf", "writer_pdf_Export"),
+    "pdfa": SofficeExport("pdf", "writer_pdf_Export", {"SelectPdfVersion": 2}, suffix="-pdfa"),
+    "odt": SofficeExport("odt", "writer8"),
+    # Inline images as data: URIs; otherwise they are written as separate
+    # files next to the .html and lost when only the .html is committed.
+    "html": SofficeExport("html", "HTML (StarWriter)", filter_options="EmbedImages"),
+    "txt": SofficeExport("txt", "Text (encoded)", filter_options="UTF8"),
+}
+
+_EXPORT_SCRIPT = Path(__file__).with_name("soffice_export.py")
+
+
+def parse_page_range(spec: str) -> list[tuple[int, int | None]]:
+    """Parse ``"1-3,5,8-"`` into 1-based inclusive ``(first, last)`` ranges.
+
+    ``last`` is None for an open-ended range. Raises ValueError on bad input.
+    """
+    ranges = []
+    for part in spec.replace(" ", "").split(","):
+        first, dash, last = part.partition("-")
+        if not first.isdigit() or (last and not last.isdigit()):
+            raise ValueError(f"Invalid page range: {part or spec!r}")
+        start = int(first)
+        end = int(last) if last else (None if dash else start)
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"Invalid page range: {part!r}")
+        ranges.append((start, end))
+    return ranges
+
+
+def normalize_page_range(spec: str) -> str:
+    """Canonical form of a page range, e.g. ``" 1-3, 5-5 "`` -> ``"1-3,5"``."""
+    return ",".join(
+        str(start) if end == start else f"{start}-{end or ''}"
+        for start, end in parse_page_range(spec)
+    )
+
+
+def output_name(target: str, stem: str, page_range: str | None = None) -> str:
+    """File name a conversion to ``target`` produces for an input named ``stem``.
+
+    Partial conversions carry their page range in the name so each range is a
+    separate output next to the full conversion.
+    """
+    if page_range:
+        stem = f"{stem}.p{page_range.replace(',', '_')}"
+    export = SOFFICE_EXPORTS.get(target)
+    return export.output_name(stem) if export else f"{stem}.{target}"
+
+
+def _soffice_profile() -> Path:
+    # Concurrent soffice processes sharing one user profile fail or hang, so
+    # every worker thread/process gets its own, reused across conversions.
+    # purge_soffice_profiles() removes them once their process is done.
+    return SOFFICE_PROFILE_ROOT / f"{os.getpid()}-{threading.get_ident()}"
+
+
+def _soffice_profile_arg() -> str:
+    return f"-env:UserInstallation={_soffice_profile().as_uri()}"
+
+
+def purge_soffice_profiles() -> int:
+    """Delete LibreOffice profiles of exited processes and of this one.
+
+    Call it when this process has no conversion running, e.g. at startup and
+    shutdown, or after a worker pool has exited.
+    """
+    if not SOFFICE_PROFILE_ROOT.exists():
+        return 0
+    
+    removed = 0
+    for entry in SOFFICE_PROFILE_ROOT.iterdir():
+        pid = entry.name.partition("-")[0]
+        if not pid.isdigit():
+            continue
+        if int(pid) == os.getpid() or not _pid_alive(int(pid)):
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def _find_soffice_or_raise() -> Path:
     soffice_path = _find_soffice_path()
     if not soffice_path:
         raise ConversionError(
@@ -64,50 +192,225 @@ def convert_docx_to_pdf(input_path: Path, output_dir: Path) -> Path:
             "On Windows, run: Get-ChildItem -Path 'C:\\' -Filter 'soffice.exe' "
             "-Recurse -ErrorAction SilentlyContinue"
         )
+    return soffice_path
+
+
+def _find_uno_python(soffice_path: Path) -> Path | None:
+    settings = get_settings()
     
-    try:
+    if settings.soffice_python_path:
+        path = Path(settings.soffice_python_path)
+        if path.exists():
+            return path
+        raise ConversionError(
+            f"SOFFICE_PYTHON_PATH configured in .env but not found: {settings.soffice_python_path}"
+        )
+    
+    python_name = "python.exe" if shutil.os.name == "nt" else "python"
+    bundled = soffice_path.resolve().parent / python_name
+    if bundled.exists():
+        return bundled
+    
+    if importlib.util.find_spec("uno") is not None:
+        return Path(sys.executable)
+    
+    return None
+
+
+def _kill_process_tree(process: subprocess.Popen) -> None:
+    # soffice forks soffice.bin, and the UNO helper starts its own soffice;
+    # killing only the direct child would orphan them with the document open.
+    if os.name == "nt":
         subprocess.run(
-            [
-                str(soffice_path),
-                "--headless",
-                "--convert-to", "pdf",
-                "--outdir", str(output_dir),
-                str(input_path),
-            ],
-            check=True,
-            timeout=120,
-            capture_output=True,
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True
+        )
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    process.kill()
+
+
+def _run_soffice(command: list[str], input_path: Path, timeout: int) -> None:
+    """Run ``command`` in its own process group, killing the whole group on timeout."""
+    if os.name == "nt":
+        group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group = {"start_new_session": True}
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **group
         )
+    except FileNotFoundError as e:
+        logger.error(f"LibreOffice executable not found: {command[0]}")
+        raise ConversionError(f"LibreOffice executable not found: {command[0]}") from e
+    
+    try:
+        _, stderr = process.communicate(timeout=timeout)
     except subprocess.TimeoutExpired as e:
-        logger.warning(f"DOCX to PDF timeout: {input_path.name}")
-        raise ConversionError(f"DOCX to PDF conversion timed out (120s): {input_path.name}") from e
-    except subprocess.CalledProcessError as e:
-        stderr = e.stderr.decode() if e.stderr else str(e)
-        logger.warning(f"DOCX to PDF failed: {stderr}")
+        _kill_process_tree(process)
+        process.communicate()
+        logger.warning(f"LibreOffice export timeout: {input_path.name}")
         raise ConversionError(
-            f"DOCX to PDF conversion failed: {stderr}"
+            f"LibreOffice export timed out ({timeout}s): {input_path.name}"
         ) from e
-    except FileNotFoundError as e:
-        logger.error(f"LibreOffice executable not found: {soffice_path}")
-        raise ConversionError(f"LibreOffice executable not found: {soffice_path}") from e
     
-    if not output_file.exists():
-        logger.error(f"Output file not created: {output_file}")
-        raise ConversionError(f"Output file not created: {output_file}")
+    if process.returncode != 0:
+        stderr = stderr.decode(errors="replace") if stderr else f"exit code {process.returncode}"
+        logger.warning(f"LibreOffice export failed: {stderr}")
+        raise ConversionError(f"LibreOffice export failed: {stderr}")
+
+
+def _export_single_load(
+    uno_python: Path,
+    soffice_path: Path,
+    input_path: Path,
+    outputs: dict[str, Path],
+    exports: dict[str, SofficeExport],
+    timeout: int,
+) -> None:
+    spec = [
+        {
+            "path": str(outputs[target]),
+            "filter": exports[target].filter_name,
+            "filter_data": exports[target].filter_data,
+            "filter_options": exports[target].filter_options,
+        }
+        for target in outputs
+    ]
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", encoding="utf-8", delete=False
+    ) as spec_file:
+        json.dump(spec, spec_file)
+    try:
+        _run_soffice(
+            [
+                str(uno_python), str(_EXPORT_SCRIPT), str(soffice_path),
+                str(input_path), spec_file.name, str(_soffice_profile()),
+            ],
+            input_path,
+            timeout,
+        )
+    finally:
+        Path(spec_file.name).unlink(missing_ok=True)
+
+
+def _export_per_target(
+    soffice_path: Path,
+    input_path: Path,
+    outputs: dict[str, Path],
+    exports: dict[str, SofficeExport],
+    timeout: int,
+) -> None:
+    for target, output_file in outputs.items():
+        export = exports[target]
+        with tempfile.TemporaryDirectory(dir=output_file.parent) as tmp_dir:
+            _run_soffice(
+                [
+                    str(soffice_path),
+                    _soffice_profile_arg(),
+                    "--headless",
+                    "--convert-to", export.convert_to(),
+                    "--outdir", tmp_dir,
+                    str(input_path),
+                ],
+                input_path,
+                timeout,
+            )
+            produced = Path(tmp_dir) / f"{input_path.stem}.{export.extension}"
+            if produced.exists():
+                produced.replace(output_file)
+
+
+def export_with_soffice(
+    input_path: Path,
+    output_dir: Path,
+    targets: list[str],
+    page_range: str | None = None,
+) -> dict[str, Path]:
+    """Export ``input_path`` to every format in ``targets``.
+
+    When a UNO-capable Python is available the document is loaded and laid out
+    once and each output is stored from that single load; otherwise each target
+    falls back to its own ``soffice --convert-to`` run. ``page_range`` limits
+    PDF exports to those pages through the ``PageRange`` filter option.
+    """
+    unknown = [t for t in targets if t not in SOFFICE_EXPORTS]
+    if unknown:
+        raise ConversionError(f"Unsupported LibreOffice export format: {', '.join(unknown)}")
     
-    return output_file
+    exports = {target: SOFFICE_EXPORTS[target] for target in targets}
+    if page_range:
+        unpaged = [t for t, export in exports.items() if export.extension != "pdf"]
+        if unpaged:
+            raise ConversionError(f"Page ranges only apply to PDF exports, not {', '.join(unpaged)}")
+        exports = {t: export.with_page_range(page_range) for t, export in exports.items()}
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = {
+        target: output_dir / output_name(target, input_path.stem, page_range)
+        for target in targets
+    }
+    timeout = SOFFICE_TIMEOUT_SECONDS + 30 * (len(outputs) - 1)
+    
+    soffice_path = _find_soffice_or_raise()
+    uno_python = _find_uno_python(soffice_path) if len(outputs) > 1 else None
+    
+    if uno_python:
+        _export_single_load(uno_python, soffice_path, input_path, outputs, exports, timeout)
+    else:
+        _export_per_target(soffice_path, input_path, outputs, exports, SOFFICE_TIMEOUT_SECONDS)
+    
+    for output_file in outputs.values():
+        if not output_file.exists():
+            logger.error(f"Output file not created: {output_file}")
+            raise ConversionError(f"Output file not created: {output_file}")
+    
+    return outputs
+
+
+def convert_docx_to_pdf(
+    input_path: Path, output_dir: Path, page_range: str | None = None
+) -> Path:
+    return export_with_soffice(input_path, output_dir, ["pdf"], page_range)["pdf"]
+
 
+def _pdf2docx_page_args(converter, page_range: str | None) -> dict:
+    # pdf2docx takes 0-based pages: a contiguous range maps to start/end
+    # (end exclusive), anything else to an explicit page list. An empty
+    # list would make pdf2docx convert every page, so it is an error here.
+    if not page_range:
+        return {}
+    ranges = parse_page_range(page_range)
+    page_count = len(converter.fitz_doc)
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        if start > page_count:
+            raise ConversionError(f"Page range {page_range} is past the last page ({page_count})")
+        return {"start": start - 1, "end": min(end, page_count) if end else None}
+    pages = []
+    for start, end in ranges:
+        pages.extend(range(start - 1, min(end or page_count, page_count)))
+    if not pages:
+        raise ConversionError(f"Page range {page_range} is past the last page ({page_count})")
+    return {"pages": sorted(set(pages))}
 
-def convert_pdf_to_docx(input_path: Path, output_dir: Path) -> Path:
+
+def convert_pdf_to_docx(
+    input_path: Path, output_dir: Path, page_range: str | None = None
+) -> Path:
     from pdf2docx import Converter
     
     output_dir.mkdir(parents=True, exist_ok=True)
-    output_file = output_dir / f"{input_path.stem}.docx"
+    output_file = output_dir / output_name("docx", input_path.stem, page_range)
     
     try:
         converter = Converter(str(input_path))
-        converter.convert(str(output_file))
-        converter.close()
+        try:
+            converter.convert(str(output_file), **_pdf2docx_page_args(converter, page_range))
+        finally:
+            converter.close()
     except Exception as e:
         logger.warning(f"PDF to DOCX failed: {str(e)}")
         raise ConversionError(f"PDF to DOCX conversion failed: {str(e)}") from e
@@ -117,3 +420,46 @@ def convert_pdf_to_docx(input_path: Path, output_dir: Path) -> Path:
         raise ConversionError(f"Output file not created: {output_file}")
     
     return output_file
+
+
+def word_available() -> bool:
+    """Whether docx2pdf can drive an installed copy of Microsoft Word."""
+    if importlib.util.find_spec("docx2pdf") is None:
+        return False
+    if sys.platform == "darwin":
+        return any(path.exists() for path in WORD_APP_PATHS)
+    if sys.platform == "win32" and winreg is not None and pythoncom is not None:
+        try:
+            winreg.OpenKey(winreg.HKEY_CLASSES_ROOT, r"Word.Application\CLSID").Close()
+            return True
+        except OSError:
+            return False
+    return False
+
+
+def convert_docx_to_pdf_with_word(input_path: Path, output_dir: Path) -> Path:
+    """DOCX to PDF through Microsoft Word automation (Windows/macOS only)."""
+    from docx2pdf import convert
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"{input_path.stem}.pdf"
+    
+    # COM must be initialised on every thread that uses it, and conversions
+    # run in executor threads.
+    if pythoncom is not None:
+        pythoncom.CoInitialize()
+    try:
+        convert(str(input_path), str(output_file))
+    except (Exception, SystemExit) as e:
+        # docx2pdf calls sys.exit(1) when Word reports an error on macOS.
+        logger.warning(f"DOCX to PDF (Word) failed: {type(e).__name__}: {str(e)}")
+        raise ConversionError(f"DOCX to PDF conversion failed: {type(e).__name__}: {str(e)}") from e
+    finally:
+        if pythoncom is not None:
+            pythoncom.CoUninitialize()
+    
+    if not output_file.exists():
+        logger.error(f"Output file not created: {output_file}")
+        raise ConversionError(f"Output file not created: {output_file}")
+    
+    return output_file
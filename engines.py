@@ -0,0 +1,428 @@
+import asyncio
+import importlib.util
+import random
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from config import get_settings
+from converter import (
+    SOFFICE_EXPORTS,
+    _find_soffice_path,
+    convert_docx_to_pdf_with_word,
+    convert_pdf_to_docx,
+    export_with_soffice,
+    output_name,
+    word_available,
+)
+from exceptions import ConversionError
+from logger import get_logger
+
+logger = get_logger()
+
+EWMA_ALPHA = 0.2
+DEFAULT_LATENCY_SECONDS = 1.0
+UNTRIED_LATENCY_FACTOR = 0.5
+TRIP_AFTER_FAILURES = 3
+
+
+class ConverterEngine:
+    """A conversion backend.
+
+    Subclasses declare the ``(source, target)`` pairs they handle, which
+    targets they can convert a page range of, and how many conversions they
+    may run at once. ``convert`` runs in a worker thread and returns
+    ``{target: output path}``; ``health_check`` must be cheap. ``probe`` may
+    run a small real conversion and decides whether an engine taken out of
+    rotation after repeated failures gets customer jobs again.
+    """
+
+    name: str = ""
+    conversions: frozenset[tuple[str, str]] = frozenset()
+    page_range_targets: frozenset[str] = frozenset()
+    multi_target: bool = False
+    max_concurrent: int = 1
+
+    def supports(self, source: str, targets: list[str], page_range: str | None = None) -> bool:
+        if len(targets) > 1 and not self.multi_target:
+            return False
+        if page_range and not all(target in self.page_range_targets for target in targets):
+            return False
+        return all((source, target) in self.conversions for target in targets)
+
+    def health_check(self) -> bool:
+        return True
+
+    def probe(self, work_dir: Path) -> bool:
+        return self.health_check()
+
+    def convert(
+        self,
+        input_path: Path,
+        output_dir: Path,
+        targets: list[str],
+        page_range: str | None = None,
+    ) -> dict[str, Path]:
+        raise NotImplementedError
+
+
+class SofficeEngine(ConverterEngine):
+    name = "soffice"
+    conversions = frozenset(("docx", target) for target in SOFFICE_EXPORTS)
+    page_range_targets = frozenset(
+        target for target, export in SOFFICE_EXPORTS.items() if export.extension == "pdf"
+    )
+    multi_target = True
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+
+    def health_check(self) -> bool:
+        try:
+            return _find_soffice_path() is not None
+        except ConversionError:
+            return False
+
+    def probe(self, work_dir):
+        sample = work_dir / "probe.txt"
+        sample.write_text("DOCUSTREAM engine probe\n", encoding="utf-8")
+        try:
+            export_with_soffice(sample, work_dir / "out", ["pdf"])
+        except ConversionError:
+            return False
+        return True
+
+    def convert(self, input_path, output_dir, targets, page_range=None):
+        return export_with_soffice(input_path, output_dir, targets, page_range)
+
+
+class Pdf2DocxEngine(ConverterEngine):
+    name = "pdf2docx"
+    conversions = frozenset({("pdf", "docx")})
+    page_range_targets = frozenset({"docx"})
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+
+    def health_check(self) -> bool:
+        return importlib.util.find_spec("pdf2docx") is not None
+
+    def convert(self, input_path, output_dir, targets, page_range=None):
+        return {"docx": convert_pdf_to_docx(input_path, output_dir, page_range)}
+
+
+class WordEngine(ConverterEngine):
+    """docx2pdf drives Microsoft Word, which only exists on Windows and macOS.
+
+    The health check looks for an installed Word, not just the docx2pdf module.
+    """
+
+    name = "docx2pdf"
+    conversions = frozenset({("docx", "pdf")})
+    max_concurrent = 1
+
+    def health_check(self) -> bool:
+        return word_available()
+
+    def convert(self, input_path, output_dir, targets, page_range=None):
+        return {"pdf": convert_docx_to_pdf_with_word(input_path, output_dir)}
+
+
+class FakeEngine(ConverterEngine):
+    """Offline stand-in that sleeps and writes placeholder outputs.
+
+    Useful for exercising and benchmarking routing without LibreOffice:
+
+        registry.register(FakeEngine("slow", {("docx", "pdf")}, latency=0.5))
+    """
+
+    def __init__(
+        self,
+        name: str,
+        conversions: set[tuple[str, str]],
+        latency: float = 0.01,
+        failure_rate: float = 0.0,
+        max_concurrent: int = 4,
+        multi_target: bool = True,
+        healthy: bool = True,
+        page_ranges: bool = True,
+    ):
+        self.name = name
+        self.conversions = frozenset(conversions)
+        self.page_range_targets = (
+            frozenset(target for _, target in conversions) if page_ranges else frozenset()
+        )
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_concurrent = max_concurrent
+        self.multi_target = multi_target
+        self.healthy = healthy
+
+    def health_check(self) -> bool:
+        return self.healthy
+
+    def probe(self, work_dir):
+        return self.healthy and random.random() >= self.failure_rate
+
+    def convert(self, input_path, output_dir, targets, page_range=None):
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConversionError(f"{self.name}: simulated failure")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        outputs = {}
+        for target in targets:
+            output_file = output_dir / output_name(target, input_path.stem, page_range)
+            output_file.write_bytes(f"{self.name}:{target}".encode("utf-8"))
+            outputs[target] = output_file
+        return outputs
+
+
+@dataclass
+class EngineState:
+    engine: ConverterEngine
+    semaphore: asyncio.Semaphore
+    in_flight: int = 0
+    completed: int = 0
+    failed: int = 0
+    consecutive_failures: int = 0
+    latency_ewma: float | None = None
+    success_ewma: float = 1.0
+    healthy: bool = True
+    checked_at: float = field(default=float("-inf"))
+    probed_at: float = field(default=float("-inf"))
+    probing: bool = False
+
+    @property
+    def busy(self) -> bool:
+        return self.in_flight >= self.engine.max_concurrent
+
+    @property
+    def untried(self) -> bool:
+        return self.completed + self.failed == 0
+
+    @property
+    def tripped(self) -> bool:
+        """Out of rotation after repeated failures until a probe passes."""
+        return self.consecutive_failures >= TRIP_AFTER_FAILURES
+
+    def score(self, default_latency: float) -> float:
+        """Expected seconds per successful conversion if routed here now."""
+        latency = default_latency if self.untried or self.latency_ewma is None else self.latency_ewma
+        queue_factor = (self.in_flight + 1) / self.engine.max_concurrent
+        return latency * max(1.0, queue_factor) / max(self.success_ewma, 0.05)
+
+    def record(self, seconds: float | None, success: bool) -> None:
+        # Failed attempts count towards latency too: time spent on a failure
+        # is as much a cost as time spent on a success.
+        if seconds is not None:
+            self.latency_ewma = (
+                seconds if self.latency_ewma is None
+                else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency_ewma
+            )
+        if success:
+            self.completed += 1
+            self.consecutive_failures = 0
+        else:
+            self.failed += 1
+            self.consecutive_failures += 1
+        self.success_ewma = EWMA_ALPHA * float(success) + (1 - EWMA_ALPHA) * self.success_ewma
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.engine.name,
+            "healthy": self.healthy,
+            "conversions": sorted(f"{s}->{t}" for s, t in self.engine.conversions),
+            "page_range_targets": sorted(self.engine.page_range_targets),
+            "max_concurrent": self.engine.max_concurrent,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "tripped": self.tripped,
+            "latency_ewma_s": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "success_rate": round(self.success_ewma, 4),
+        }
+
+
+class EngineRegistry:
+    """Routes each job to the engine with the best expected completion time.
+
+    The score combines measured latency, recent success rate and how busy the
+    engine is. Engines that have not run yet are scored with half the fastest
+    known latency, so each one is tried before the leader is picked again.
+    After ``TRIP_AFTER_FAILURES`` failures in a row an engine is taken out of
+    rotation (unless no other engine can take the job). Every
+    ``health_check_seconds`` it is probed off the request path, and a passing
+    probe lets it back in on trial: one more failure trips it again. With
+    ``fallback`` enabled a failed attempt moves on to the next candidate.
+    """
+
+    def __init__(self, fallback: bool = True, health_check_seconds: float = 60):
+        self.fallback = fallback
+        self.health_check_seconds = health_check_seconds
+        self._engines: dict[str, EngineState] = {}
+
+    def register(self, engine: ConverterEngine) -> None:
+        self._engines[engine.name] = EngineState(
+            engine, asyncio.Semaphore(engine.max_concurrent)
+        )
+
+    def unregister(self, name: str) -> None:
+        self._engines.pop(name, None)
+
+    def supports(self, source: str, targets: list[str], page_range: str | None = None) -> bool:
+        return any(
+            state.engine.supports(source, targets, page_range) for state in self._engines.values()
+        )
+
+    def _is_healthy(self, state: EngineState) -> bool:
+        now = time.monotonic()
+        if now - state.checked_at >= self.health_check_seconds:
+            try:
+                state.healthy = bool(state.engine.health_check())
+            except Exception:
+                state.healthy = False
+            state.checked_at = now
+        return state.healthy
+
+    def _probe(self, state: EngineState) -> None:
+        try:
+            with tempfile.TemporaryDirectory(prefix="docustream-probe-") as work_dir:
+                passed = bool(state.engine.probe(Path(work_dir)))
+        except (Exception, SystemExit):
+            passed = False
+        if passed and state.tripped:
+            state.consecutive_failures = TRIP_AFTER_FAILURES - 1
+            logger.info(f"Engine {state.engine.name} passed its probe; back in rotation on trial")
+        state.probed_at = time.monotonic()
+        state.probing = False
+
+    def _schedule_probes(self, tripped: list[EngineState]) -> None:
+        now = time.monotonic()
+        due = [
+            s for s in tripped
+            if not s.probing and now - s.probed_at >= self.health_check_seconds
+        ]
+        if not due:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        for state in due:
+            state.probing = True
+            if loop is None:
+                self._probe(state)
+            else:
+                loop.run_in_executor(None, self._probe, state)
+
+    def candidates(
+        self, source: str, targets: list[str], page_range: str | None = None
+    ) -> list[EngineState]:
+        eligible = [
+            state for state in self._engines.values()
+            if state.engine.supports(source, targets, page_range) and self._is_healthy(state)
+        ]
+        tripped = [s for s in eligible if s.tripped]
+        if tripped:
+            self._schedule_probes(tripped)
+            # A lone engine stays in use even when tripped; rejecting every
+            # job would not be better.
+            eligible = [s for s in eligible if not s.tripped] or eligible
+        known = [s.latency_ewma for s in eligible if not s.untried and s.latency_ewma is not None]
+        default_latency = (
+            min(known) * UNTRIED_LATENCY_FACTOR if known else DEFAULT_LATENCY_SECONDS
+        )
+        return sorted(eligible, key=lambda s: (s.busy, s.score(default_latency)))
+
+    def _plan(
+        self, source: str, targets: list[str], page_range: str | None = None
+    ) -> list[EngineState]:
+        candidates = self.candidates(source, targets, page_range)
+        if not candidates:
+            if self.supports(source, targets, page_range):
+                raise ConversionError(
+                    f"No healthy converter engine for {source} → {', '.join(targets)}"
+                )
+            raise ConversionError(f"Unsupported conversion: {source} → {', '.join(targets)}")
+        return candidates if self.fallback else candidates[:1]
+
+    async def run(
+        self,
+        source: str,
+        targets: list[str],
+        input_path: Path,
+        output_dir: Path,
+        page_range: str | None = None,
+    ) -> tuple[str, dict[str, Path]]:
+        candidates = self._plan(source, targets, page_range)
+        loop = asyncio.get_running_loop()
+        last_error: Exception | None = None
+        for state in candidates:
+            state.in_flight += 1
+            start = None
+            try:
+                async with state.semaphore:
+                    start = time.monotonic()
+                    outputs = await loop.run_in_executor(
+                        None, state.engine.convert, input_path, output_dir, targets, page_range
+                    )
+            except (Exception, SystemExit) as e:
+                # SystemExit from a misbehaving library must not stop the server.
+                state.record(time.monotonic() - start if start is not None else None, success=False)
+                logger.warning(f"Engine {state.engine.name} failed | {type(e).__name__}: {str(e)}")
+                last_error = e if isinstance(e, Exception) else ConversionError(
+                    f"{state.engine.name} exited during conversion: {str(e)}"
+                )
+                continue
+            finally:
+                state.in_flight -= 1
+            state.record(time.monotonic() - start, success=True)
+            return state.engine.name, outputs
+
+        raise last_error
+
+    def run_sync(
+        self,
+        source: str,
+        targets: list[str],
+        input_path: Path,
+        output_dir: Path,
+        page_range: str | None = None,
+    ) -> tuple[str, dict[str, Path]]:
+        """Blocking variant of ``run`` for callers without an event loop."""
+        last_error: Exception | None = None
+        for state in self._plan(source, targets, page_range):
+            start = time.monotonic()
+            try:
+                outputs = state.engine.convert(input_path, output_dir, targets, page_range)
+            except (Exception, SystemExit) as e:
+                state.record(time.monotonic() - start, success=False)
+                logger.warning(f"Engine {state.engine.name} failed | {type(e).__name__}: {str(e)}")
+                last_error = e if isinstance(e, Exception) else ConversionError(
+                    f"{state.engine.name} exited during conversion: {str(e)}"
+                )
+                continue
+            state.record(time.monotonic() - start, success=True)
+            return state.engine.name, outputs
+
+        raise last_error
+
+    def stats(self) -> list[dict]:
+        return [state.to_dict() for state in self._engines.values()]
+
+
+_engine_registry: EngineRegistry | None = None
+
+
+def get_engine_registry() -> EngineRegistry:
+    global _engine_registry
+    if _engine_registry is None:
+        settings = get_settings()
+        _engine_registry = EngineRegistry(
+            fallback=settings.engine_fallback_enabled,
+            health_check_seconds=settings.engine_health_check_seconds,
+        )
+        _engine_registry.register(SofficeEngine(settings.max_concurrent_tasks))
+        _engine_registry.register(Pdf2DocxEngine(settings.max_concurrent_tasks))
+        _engine_registry.register(WordEngine())
+    return _engine_registry
@@ -1,12 +1,15 @@
 import asyncio
-import json
+import sys
+import time
 import uuid
-from dataclasses import dataclass, field, asdict
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
+from itertools import islice
 from pathlib import Path
 from typing import Optional
 from config import get_settings
+from encoding import dumps, loads
+from storage import get_storage_manager
 
 
 class JobStatus(str, Enum):
@@ -16,37 +19,152 @@ class JobStatus(str, Enum):
     FAILED = "FAILED"
 
 
-@dataclass
+def _to_epoch(value) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _isoformat(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+
 class JobRecord:
-    job_id: str
-    status: JobStatus
-    source_format: str
-    target_format: str
-    input_filename: str
-    created_at: datetime
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
-    output_file: Optional[str] = None
-    error: Optional[str] = None
-    
+    """In-memory job record.
+
+    Timestamps are stored as UTC epoch seconds and format strings are interned
+    so that large stores stay compact. Only the encoded bytes that requests
+    serve are cached, on first use, and they are dropped whenever a field is
+    assigned. Persisting the store does not fill the cache.
+    """
+
+    __slots__ = (
+        "job_id",
+        "status",
+        "source_format",
+        "target_format",
+        "target_formats",
+        "input_filename",
+        "page_range",
+        "created_at",
+        "started_at",
+        "completed_at",
+        "output_file",
+        "output_files",
+        "error",
+        "_json",
+        "_summary_json",
+    )
+
+    _CACHE_SLOTS = frozenset(("_json", "_summary_json"))
+
+    def __init__(
+        self,
+        job_id: str,
+        status: JobStatus,
+        source_format: str,
+        target_format: str,
+        input_filename: str,
+        created_at: float,
+        started_at: Optional[float] = None,
+        completed_at: Optional[float] = None,
+        output_file: Optional[str] = None,
+        error: Optional[str] = None,
+        target_formats: Optional[tuple[str, ...]] = None,
+        output_files: Optional[dict[str, str]] = None,
+        page_range: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.status = status
+        self.source_format = sys.intern(source_format)
+        self.target_format = sys.intern(target_format)
+        self.target_formats = tuple(
+            sys.intern(target) for target in (target_formats or (target_format,))
+        )
+        self.input_filename = input_filename
+        self.page_range = page_range
+        self.created_at = created_at
+        self.started_at = started_at
+        self.completed_at = completed_at
+        self.output_file = output_file
+        self.output_files = output_files
+        self.error = error
+
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        if name not in self._CACHE_SLOTS:
+            object.__setattr__(self, "_json", None)
+            object.__setattr__(self, "_summary_json", None)
+
+    def __repr__(self) -> str:
+        return f"JobRecord(job_id={self.job_id!r}, status={self.status.value})"
+
     def to_dict(self) -> dict:
-        data = asdict(self)
-        data["status"] = self.status.value
-        data["created_at"] = self.created_at.isoformat()
-        data["started_at"] = self.started_at.isoformat() if self.started_at else None
-        data["completed_at"] = self.completed_at.isoformat() if self.completed_at else None
-        return data
-    
+        """Return the full record as a JSON-ready dict (built on every call)."""
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "source_format": self.source_format,
+            "target_format": self.target_format,
+            "target_formats": list(self.target_formats),
+            "input_filename": self.input_filename,
+            "page_range": self.page_range,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "completed_at": _isoformat(self.completed_at),
+            "output_file": self.output_file,
+            "output_files": self.output_files,
+            "error": self.error,
+        }
+
+    def encode(self) -> bytes:
+        """Encoded full record; reuses the cached bytes but never fills them."""
+        return self._json if self._json is not None else dumps(self.to_dict())
+
+    def to_json(self) -> bytes:
+        if self._json is None:
+            self._json = dumps(self.to_dict())
+        return self._json
+
+    def summary_json(self) -> bytes:
+        """Encoded subset of fields used by the job listing."""
+        if self._summary_json is None:
+            self._summary_json = dumps({
+                "job_id": self.job_id,
+                "status": self.status.value,
+                "source_format": self.source_format,
+                "target_format": self.target_format,
+                "target_formats": list(self.target_formats),
+                "input_filename": self.input_filename,
+                "page_range": self.page_range,
+                "created_at": _isoformat(self.created_at),
+                "completed_at": _isoformat(self.completed_at),
+            })
+        return self._summary_json
+
     @classmethod
     def from_dict(cls, data: dict) -> "JobRecord":
-        data = data.copy()
-        data["status"] = JobStatus(data["status"])
-        data["created_at"] = datetime.fromisoformat(data["created_at"])
-        if data["started_at"]:
-            data["started_at"] = datetime.fromisoformat(data["started_at"])
-        if data["completed_at"]:
-            data["completed_at"] = datetime.fromisoformat(data["completed_at"])
-        return cls(**data)
+        return cls(
+            job_id=data["job_id"],
+            status=JobStatus(data["status"]),
+            source_format=data["source_format"],
+            target_format=data["target_format"],
+            input_filename=data["input_filename"],
+            created_at=_to_epoch(data["created_at"]),
+            started_at=_to_epoch(data.get("started_at")),
+            completed_at=_to_epoch(data.get("completed_at")),
+            output_file=data.get("output_file"),
+            error=data.get("error"),
+            target_formats=data.get("target_formats"),
+            output_files=data.get("output_files"),
+            page_range=data.get("page_range"),
+        )
 
 
 class JobStore:
@@ -60,8 +178,8 @@ class JobStore:
         async with self._lock:
             if self._jobs_file.exists():
                 try:
-                    with open(self._jobs_file, "r") as f:
-                        data = json.load(f)
+                    with open(self._jobs_file, "rb") as f:
+                        data = loads(f.read())
                     self._jobs = {
                         job_id: JobRecord.from_dict(record)
                         for job_id, record in data.items()
@@ -71,25 +189,32 @@ class JobStore:
     
     async def _persist(self) -> None:
         self.storage_dir.mkdir(parents=True, exist_ok=True)
-        data = {
-            job_id: record.to_dict()
+        body = b",".join(
+            dumps(job_id) + b":" + record.encode()
             for job_id, record in self._jobs.items()
-        }
-        with open(self._jobs_file, "w") as f:
-            json.dump(data, f, indent=2)
+        )
+        with open(self._jobs_file, "wb") as f:
+            f.write(b"{" + body + b"}")
     
     async def create(
-        self, source_format: str, target_format: str, filename: str
+        self,
+        source_format: str,
+        target_formats: list[str],
+        filename: str,
+        job_id: Optional[str] = None,
+        page_range: Optional[str] = None,
     ) -> str:
         async with self._lock:
-            job_id = str(uuid.uuid4())
+            job_id = job_id or str(uuid.uuid4())
             record = JobRecord(
                 job_id=job_id,
                 status=JobStatus.PENDING,
                 source_format=source_format,
-                target_format=target_format,
+                target_format=target_formats[0],
+                target_formats=tuple(target_formats),
                 input_filename=filename,
-                created_at=datetime.utcnow(),
+                page_range=page_range,
+                created_at=time.time(),
             )
             self._jobs[job_id] = record
             await self._persist()
@@ -99,13 +224,22 @@ class JobStore:
         async with self._lock:
             return self._jobs.get(job_id)
     
+    async def delete(self, job_id: str) -> bool:
+        """Forget a job that was never queued; its files are left alone."""
+        async with self._lock:
+            if self._jobs.pop(job_id, None) is None:
+                return False
+            await self._persist()
+            return True
+    
     async def update(
         self,
         job_id: str,
         status: JobStatus,
         output_file: Optional[str] = None,
         error: Optional[str] = None,
-        started_at: Optional[datetime] = None,
+        started_at: Optional[float] = None,
+        output_files: Optional[dict[str, str]] = None,
     ) -> None:
         async with self._lock:
             if job_id not in self._jobs:
@@ -115,48 +249,99 @@ class JobStore:
             record.status = status
             if output_file:
                 record.output_file = output_file
+            if output_files:
+                record.output_files = output_files
+                record.output_file = output_file or output_files.get(record.target_format)
             if error:
                 record.error = error
             if started_at:
                 record.started_at = started_at
             if status in (JobStatus.SUCCESS, JobStatus.FAILED):
-                record.completed_at = datetime.utcnow()
+                record.completed_at = time.time()
             
             await self._persist()
     
+    async def cleanup_expired(self, ttl_seconds: int) -> list[str]:
+        async with self._lock:
+            cutoff = time.time() - ttl_seconds
+            to_delete = [
+                job_id
+                for job_id, record in self._jobs.items()
+                if record.completed_at and record.completed_at < cutoff
+            ]
+            
+            for job_id in to_delete:
+                del self._jobs[job_id]
+            
+            if to_delete:
+                await self._persist()
+            
+            return to_delete
+    
     async def list(
         self, status_filter: Optional[str] = None, limit: int = 50
     ) -> tuple[list[JobRecord], int]:
         async with self._lock:
-            jobs = list(self._jobs.values())
-            
+            status_enum = None
             if status_filter:
                 try:
                     status_enum = JobStatus(status_filter)
-                    jobs = [j for j in jobs if j.status == status_enum]
                 except ValueError:
                     pass
             
-            jobs.sort(key=lambda x: x.created_at, reverse=True)
-            return jobs[:limit], len(jobs)
+            # Records are kept in creation order, so the newest jobs are at the
+            # end of the dict and no sort is needed.
+            newest_first = reversed(self._jobs.values())
+            if status_enum is None:
+                return list(islice(newest_first, limit)), len(self._jobs)
+            
+            jobs = []
+            total = 0
+            for job in newest_first:
+                if job.status is status_enum:
+                    total += 1
+                    if total <= limit:
+                        jobs.append(job)
+            return jobs, total
     
-    async def cleanup_expired(self, ttl_seconds: int) -> int:
+    async def rebase_paths(self) -> int:
+        """Point missing output paths outside the sharded tree at the job's directory.
+
+        Paths are resolved from the job ID at every startup rather than from a
+        list of moved directories, so a restart after an interrupted migration
+        still repairs them. Jobs whose output still exists, such as those in a
+        flat directory the migration skipped, are left alone.
+        """
+        storage = get_storage_manager()
+        
+        def rebase(job_id: str, path: str) -> str:
+            stored = Path(path)
+            if stored.is_relative_to(storage.jobs_root) or job_id not in stored.parts:
+                return path
+            last = len(stored.parts) - 1 - stored.parts[::-1].index(job_id)
+            return str(storage._job_path(job_id).joinpath(*stored.parts[last + 1:]))
+        
         async with self._lock:
-            now = datetime.utcnow()
-            to_delete = [
-                job_id
-                for job_id, record in self._jobs.items()
-                if record.completed_at
-                and (now - record.completed_at).total_seconds() > ttl_seconds
-            ]
-            
-            for job_id in to_delete:
-                del self._jobs[job_id]
+            updated = 0
+            for job_id, record in self._jobs.items():
+                if not record.output_file or Path(record.output_file).exists():
+                    continue
+                output_file = rebase(job_id, record.output_file)
+                output_files = {
+                    target: rebase(job_id, path)
+                    for target, path in (record.output_files or {}).items()
+                }
+                if output_file == record.output_file and output_files == (record.output_files or {}):
+                    continue
+                record.output_file = output_file
+                if record.output_files:
+                    record.output_files = output_files
+                updated += 1
             
-            if to_delete:
+            if updated:
                 await self._persist()
             
-            return len(to_delete)
+            return updated
 
 
 _job_store: JobStore | None = None
@@ -168,3 +353,16 @@ def get_job_store() -> JobStore:
         settings = get_settings()
         _job_store = JobStore(settings.storage_path)
     return _job_store
+
+
+async def purge_expired_jobs() -> int:
+    """Forget jobs finished more than JOB_TTL_SECONDS ago and delete their files."""
+    job_store = get_job_store()
+    storage = get_storage_manager()
+    
+    expired = await job_store.cleanup_expired(get_settings().job_ttl_seconds)
+    # rmtree is blocking file I/O; keep it off the event loop.
+    loop = asyncio.get_running_loop()
+    for job_id in expired:
+        await loop.run_in_executor(None, storage.cleanup_job, job_id)
+    return len(expired)
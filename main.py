@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -5,7 +6,11 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from config import get_settings
 from logger import setup_logger, get_logger
-from jobs import get_job_store
+from jobs import get_job_store, purge_expired_jobs
+from uploads import get_upload_store, purge_expired_uploads
+from storage import get_storage_manager
+from converter import purge_soffice_profiles
+from monitor import get_loop_monitor
 from processor import get_task_processor, cleanup_task_processor
 from routes import router
 from middleware import StructuredLoggingMiddleware
@@ -14,23 +19,67 @@ from exceptions import DocustreamError
 logger = get_logger()
 
 
+async def _gc_loop(interval_seconds: int) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            jobs_removed = await purge_expired_jobs()
+            uploads_removed = await purge_expired_uploads()
+            if jobs_removed or uploads_removed:
+                logger.info(f"Garbage collection | jobs={jobs_removed} | uploads={uploads_removed}")
+        except Exception:
+            logger.exception("Garbage collection failed")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logger()
     logger.info("DOCUSTREAM starting up | version=1.0.0")
     
+    settings = get_settings()
+    if settings.loop_monitor_enabled:
+        await get_loop_monitor().start()
+        logger.info("Event loop monitor started")
+    
     job_store = get_job_store()
     await job_store.load()
     logger.info("Job store loaded from disk")
     
+    storage = get_storage_manager()
+    moved, skipped = storage.migrate_flat_layout()
+    if moved:
+        logger.info(f"Migrated job directories to sharded layout | dirs={len(moved)}")
+    for job_id in skipped:
+        logger.warning(f"Left flat job directory in place, sharded copy already exists | job_id={job_id}")
+    rebased = await job_store.rebase_paths()
+    if rebased:
+        logger.info(f"Rebased job output paths to sharded layout | jobs={rebased}")
+    purged = storage.purge_scratch()
+    if purged:
+        logger.info(f"Removed stale scratch directories | count={purged}")
+    purge_soffice_profiles()
+    
+    upload_store = get_upload_store()
+    await upload_store.load()
+    removed = await purge_expired_uploads()
+    logger.info(f"Upload sessions loaded from disk | expired_removed={removed}")
+    
     task_processor = await get_task_processor()
     logger.info("Task processor started")
     
+    gc_task = asyncio.create_task(_gc_loop(settings.gc_interval_seconds))
+    
     yield
     
     logger.info("DOCUSTREAM shutting down")
+    gc_task.cancel()
+    await asyncio.gather(gc_task, return_exceptions=True)
     await cleanup_task_processor()
     logger.info("Task processor stopped")
+    purge_soffice_profiles()
+    
+    if settings.loop_monitor_enabled:
+        await get_loop_monitor().stop()
 
 
 app = FastAPI(title="DOCUSTREAM", version="1.0.0", lifespan=lifespan)
@@ -0,0 +1,214 @@
+import asyncio
+import bisect
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from config import get_settings
+from logger import get_logger
+
+logger = get_logger()
+
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+STACK_DEPTH = 12
+MAX_CALL_SITES = 200
+MAX_PENDING_WARNINGS = 100
+MAX_WATCHDOG_CHECK_SECONDS = 0.01
+_PROJECT_DIR = str(Path(__file__).resolve().parent)
+
+
+@dataclass
+class CallSite:
+    site: str
+    stack: list[str]
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "site": self.site,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "stack": self.stack,
+        }
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling lag and catches blocking callbacks.
+
+    A probe task sleeps for ``interval`` and records how late it wakes up. A
+    watchdog thread checks the probe's heartbeat; once the probe is more than
+    ``threshold`` past its expected wake time the loop thread's current stack
+    is captured and charged with the stall once the probe runs again.
+
+    The probe cannot tell when a blocking callback started, only when its own
+    wake-up was due, so callbacks blocking longer than ``threshold +
+    interval`` are always captured, while shorter ones (above ``threshold``)
+    are caught only when they start close to a probe wake-up. Lower
+    ``interval`` to tighten the bound. Nothing is traced while
+    the loop is healthy, so the monitor is cheap enough to leave on. Stalls
+    are grouped by the innermost frame that belongs to this project. Stall
+    warnings are written by the watchdog thread so logging never blocks the
+    loop it is reporting on.
+    """
+
+    def __init__(self, interval_ms: int, threshold_ms: int):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.lag_counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.lag_samples = 0
+        self.lag_total_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.call_sites: dict[str, CallSite] = {}
+        self._heartbeat = time.monotonic()
+        self._pending_stall: tuple | None = None
+        self._warnings: deque[str] = deque(maxlen=MAX_PENDING_WARNINGS)
+        self._lock = threading.Lock()
+        self._loop_thread_id: int | None = None
+        self._probe: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._probe = asyncio.create_task(self._run_probe())
+        self._watchdog = threading.Thread(
+            target=self._run_watchdog, name="loop-monitor", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._probe:
+            self._probe.cancel()
+            await asyncio.gather(self._probe, return_exceptions=True)
+            self._probe = None
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def _run_probe(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._record_lag(max(0.0, now - expected) * 1000)
+            with self._lock:
+                self._heartbeat = now
+                stall = self._pending_stall
+                self._pending_stall = None
+            if stall:
+                self._charge_stall(stall, (now - expected) * 1000)
+
+    def _run_watchdog(self) -> None:
+        check_every = max(min(self.threshold / 4, MAX_WATCHDOG_CHECK_SECONDS), 0.001)
+        while not self._stopped.wait(check_every):
+            self._flush_warnings()
+            with self._lock:
+                heartbeat = self._heartbeat
+                already_captured = self._pending_stall is not None
+            overdue = time.monotonic() - (heartbeat + self.interval)
+            if already_captured or overdue <= self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=STACK_DEPTH)
+            with self._lock:
+                if self._heartbeat == heartbeat:
+                    self._pending_stall = tuple(
+                        (entry.filename, entry.lineno, entry.name) for entry in stack
+                    )
+        self._flush_warnings()
+
+    def _flush_warnings(self) -> None:
+        while self._warnings:
+            logger.warning(self._warnings.popleft())
+
+    def _record_lag(self, lag_ms: float) -> None:
+        self.lag_counts[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.lag_samples += 1
+        self.lag_total_ms += lag_ms
+        self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+
+    def _charge_stall(self, stack: tuple, lag_ms: float) -> None:
+        frames = [f"{filename}:{lineno} in {name}" for filename, lineno, name in stack]
+        project_frames = [
+            frame for frame, (filename, _, _) in zip(frames, stack)
+            if filename.startswith(_PROJECT_DIR) and "site-packages" not in filename
+        ]
+        site = project_frames[-1] if project_frames else frames[-1]
+        self._warnings.append(f"Event loop blocked for {lag_ms:.0f}ms | {site}")
+
+        call_site = self.call_sites.get(site)
+        if call_site is None:
+            if len(self.call_sites) >= MAX_CALL_SITES:
+                return
+            call_site = CallSite(site=site, stack=frames)
+            self.call_sites[site] = call_site
+
+        call_site.count += 1
+        call_site.total_ms += lag_ms
+        call_site.max_ms = max(call_site.max_ms, lag_ms)
+
+    def _percentile(self, fraction: float) -> float | None:
+        if not self.lag_samples:
+            return None
+        rank = fraction * self.lag_samples
+        seen = 0
+        for bucket, count in enumerate(self.lag_counts):
+            seen += count
+            if seen >= rank:
+                if bucket < len(LAG_BUCKETS_MS):
+                    return min(LAG_BUCKETS_MS[bucket], round(self.lag_max_ms, 2))
+                return round(self.lag_max_ms, 2)
+        return round(self.lag_max_ms, 2)
+
+    def snapshot(self, top: int = 20) -> dict:
+        buckets = [
+            {"le_ms": bound, "count": count}
+            for bound, count in zip(LAG_BUCKETS_MS + ("inf",), self.lag_counts)
+        ]
+        ranked = sorted(self.call_sites.values(), key=lambda s: s.total_ms, reverse=True)
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag": {
+                "samples": self.lag_samples,
+                "mean_ms": round(self.lag_total_ms / self.lag_samples, 3) if self.lag_samples else None,
+                "p50_ms": self._percentile(0.5),
+                "p99_ms": self._percentile(0.99),
+                "max_ms": round(self.lag_max_ms, 2),
+                "buckets": buckets,
+            },
+            "blocking_call_sites": [site.to_dict() for site in ranked[:top]],
+        }
+
+    def reset(self) -> None:
+        self.lag_counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.lag_samples = 0
+        self.lag_total_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.call_sites.clear()
+
+
+_loop_monitor: LoopMonitor | None = None
+
+
+def get_loop_monitor() -> LoopMonitor:
+    global _loop_monitor
+    if _loop_monitor is None:
+        settings = get_settings()
+        _loop_monitor = LoopMonitor(
+            settings.loop_monitor_interval_ms,
+            settings.loop_block_threshold_ms,
+        )
+    return _loop_monitor
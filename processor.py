@@ -2,7 +2,7 @@ import asyncio
 import logging
 from pathlib import Path
 from typing import Callable, Coroutine, Any
-from converter import convert_docx_to_pdf, convert_pdf_to_docx
+from engines import get_engine_registry
 from jobs import get_job_store, JobStatus
 from storage import get_storage_manager
 from exceptions import ConversionError, StorageError
@@ -76,15 +76,25 @@ class DocumentProcessor:
         self.task_processor = task_processor
     
     def submit_conversion(
-        self, job_id: str, filename: str, source: str, target: str
+        self,
+        job_id: str,
+        filename: str,
+        source: str,
+        targets: list[str],
+        page_range: str | None = None,
     ) -> bool:
         async def coro_factory() -> None:
-            await self.process_document(job_id, filename, source, target)
+            await self.process_document(job_id, filename, source, targets, page_range)
         
         return self.task_processor.queue_task(job_id, coro_factory)
     
     async def process_document(
-        self, job_id: str, filename: str, source: str, target: str
+        self,
+        job_id: str,
+        filename: str,
+        source: str,
+        targets: list[str],
+        page_range: str | None = None,
     ) -> None:
         job_store = get_job_store()
         storage = get_storage_manager()
@@ -96,24 +106,29 @@ class DocumentProcessor:
             loop = asyncio.get_event_loop()
             input_path = storage.input_path(job_id, filename)
             output_dir = storage.output_dir(job_id)
+            scratch_dir = storage.scratch_dir(job_id)
             
-            if source == "docx" and target == "pdf":
-                output_path = await loop.run_in_executor(
-                    None, convert_docx_to_pdf, input_path, output_dir
+            try:
+                engine, scratch_paths = await get_engine_registry().run(
+                    source, targets, input_path, scratch_dir, page_range
                 )
-            elif source == "pdf" and target == "docx":
-                output_path = await loop.run_in_executor(
-                    None, convert_pdf_to_docx, input_path, output_dir
+                output_paths = await loop.run_in_executor(
+                    None, storage.commit_outputs, scratch_paths, output_dir
                 )
-            else:
-                raise ConversionError(f"Unsupported conversion: {source} → {target}")
+            finally:
+                await loop.run_in_executor(None, storage.discard_scratch, scratch_dir)
             
             await job_store.update(
                 job_id,
                 JobStatus.SUCCESS,
-                output_file=str(output_path),
+                output_file=str(output_paths[targets[0]]),
+                output_files={target: str(path) for target, path in output_paths.items()},
+            )
+            output_size = sum(path.stat().st_size for path in output_paths.values())
+            logger.info(
+                f"Job {job_id}: completed successfully | engine={engine} | outputs={len(output_paths)} "
+                f"| output_size={output_size}"
             )
-            logger.info(f"Job {job_id}: completed successfully | output_size={output_path.stat().st_size}")
         except ConversionError as e:
             logger.warning(f"Job {job_id}: conversion failed | {str(e)}")
             await job_store.update(job_id, JobStatus.FAILED, error=str(e))
@@ -1,10 +1,19 @@
+import asyncio
+import base64
+import hashlib
 from enum import Enum
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Request
 from fastapi.responses import FileResponse
+from config import get_settings
+from converter import normalize_page_range
+from engines import get_engine_registry
+from encoding import FastJSONResponse, dumps
 from jobs import get_job_store, JobStatus
 from processor import get_document_processor
 from storage import get_storage_manager
+from uploads import get_upload_store, UploadSession
+from monitor import get_loop_monitor
 from dependencies import verify_api_key
 from logger import get_logger
 from exceptions import StorageError, JobNotFoundError
@@ -16,33 +25,69 @@ router = APIRouter()
 class DocumentFormat(str, Enum):
     DOCX = "docx"
     PDF = "pdf"
+    PDFA = "pdfa"
+    ODT = "odt"
+    HTML = "html"
+    TXT = "txt"
+
+
+CHECKSUM_ALGORITHMS = {"md5", "sha1", "sha256"}
+
+
+def _validate_conversion(source: str, target_formats: list[DocumentFormat]) -> list[str]:
+    targets = list(dict.fromkeys(target.value for target in target_formats))
+    
+    if source in targets:
+        logger.warning(f"Rejected job: source and target formats identical ({source})")
+        raise HTTPException(status_code=400, detail="Source and target formats must differ")
+    
+    if not get_engine_registry().supports(source, targets):
+        logger.warning(f"Rejected job: unsupported conversion {source} -> {','.join(targets)}")
+        raise HTTPException(status_code=400, detail="Unsupported conversion")
+    
+    return targets
+
+
+def _validate_page_range(source: str, targets: list[str], page_range: str | None) -> str | None:
+    if not page_range:
+        return None
+    
+    try:
+        page_range = normalize_page_range(page_range)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not get_engine_registry().supports(source, targets, page_range):
+        logger.warning(f"Rejected job: page range not supported for {source} -> {','.join(targets)}")
+        raise HTTPException(
+            status_code=400, detail="Page ranges are only supported for PDF and DOCX output"
+        )
+    
+    return page_range
 
 
 @router.post("/jobs/submit")
 async def submit_job(
     file: UploadFile = File(...),
     source_format: DocumentFormat = Form(...),
-    target_format: DocumentFormat = Form(...),
+    target_format: list[DocumentFormat] = Form(...),
+    page_range: str = Form(None),
     _: str = Depends(verify_api_key),
 ) -> dict:
     source = source_format.value
-    target = target_format.value
-    
-    if source == target:
-        logger.warning(f"Rejected job: source and target formats identical ({source})")
-        raise HTTPException(status_code=400, detail="Source and target formats must differ")
-    
-    if not ((source == "docx" and target == "pdf") or (source == "pdf" and target == "docx")):
-        logger.warning(f"Rejected job: unsupported conversion {source} -> {target}")
-        raise HTTPException(status_code=400, detail="Unsupported conversion")
+    targets = _validate_conversion(source, target_format)
+    page_range = _validate_page_range(source, targets, page_range)
     
     job_store = get_job_store()
     storage = get_storage_manager()
     
     try:
-        job_id = await job_store.create(source, target, file.filename)
+        job_id = await job_store.create(source, targets, file.filename, page_range=page_range)
         await storage.save_upload(job_id, file.filename, file)
-        logger.info(f"Job {job_id}: created | file={file.filename} | {source}->{target}")
+        logger.info(
+            f"Job {job_id}: created | file={file.filename} | {source}->{','.join(targets)}"
+            f"{f' | pages={page_range}' if page_range else ''}"
+        )
     except StorageError as e:
         logger.error(f"Job {job_id}: storage error | {str(e)}")
         raise HTTPException(status_code=413, detail=str(e))
@@ -51,7 +96,7 @@ async def submit_job(
         raise HTTPException(status_code=500, detail="Upload failed")
     
     doc_processor = await get_document_processor()
-    queued = doc_processor.submit_conversion(job_id, file.filename, source, target)
+    queued = doc_processor.submit_conversion(job_id, file.filename, source, targets, page_range)
     
     if not queued:
         logger.warning(f"Job {job_id}: task queue full")
@@ -60,8 +105,189 @@ async def submit_job(
     return {"job_id": job_id, "status": "PENDING"}
 
 
+def _upload_status(session: UploadSession) -> dict:
+    return {
+        "upload_id": session.upload_id,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "offset": session.offset,
+        "missing_chunks": session.missing_chunks(),
+        "expires_at": session.expires_at,
+    }
+
+
+@router.post("/uploads")
+async def create_upload(
+    filename: str = Form(...),
+    size: int = Form(..., gt=0),
+    source_format: DocumentFormat = Form(...),
+    target_format: list[DocumentFormat] = Form(...),
+    page_range: str = Form(None),
+    _: str = Depends(verify_api_key),
+) -> dict:
+    source = source_format.value
+    targets = _validate_conversion(source, target_format)
+    page_range = _validate_page_range(source, targets, page_range)
+    
+    settings = get_settings()
+    if size > settings.max_file_size_mb * 1024 * 1024:
+        logger.warning(f"Rejected upload: {filename} declares {size} bytes")
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds maximum size of {settings.max_file_size_mb}MB",
+        )
+    
+    name = Path(filename).name
+    if name in ("", ".", ".."):
+        logger.warning(f"Rejected upload: invalid filename {filename!r}")
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    filename = name
+    
+    upload_store = get_upload_store()
+    storage = get_storage_manager()
+    
+    session = await upload_store.create(
+        filename,
+        source,
+        targets,
+        size,
+        settings.upload_chunk_size_mb * 1024 * 1024,
+        settings.upload_ttl_seconds,
+        page_range,
+    )
+    try:
+        storage.preallocate(storage.job_dir(session.upload_id) / filename, size)
+    except StorageError as e:
+        await upload_store.pop(session.upload_id)
+        storage.cleanup_job(session.upload_id)
+        logger.error(f"Upload {session.upload_id}: storage error | {str(e)}")
+        raise HTTPException(status_code=507, detail=str(e))
+    
+    logger.info(
+        f"Upload {session.upload_id}: created | file={filename} | size={size} "
+        f"| chunks={session.chunk_count}"
+    )
+    return _upload_status(session)
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    _: str = Depends(verify_api_key),
+) -> dict:
+    upload_store = get_upload_store()
+    storage = get_storage_manager()
+    settings = get_settings()
+    
+    session = await upload_store.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if not 0 <= index < session.chunk_count:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+    
+    checksum = request.headers.get("Upload-Checksum", "").split(" ", 1)
+    if len(checksum) != 2 or checksum[0].lower() not in CHECKSUM_ALGORITHMS:
+        raise HTTPException(
+            status_code=400,
+            detail="Upload-Checksum header required: '<md5|sha1|sha256> <base64 digest>'",
+        )
+    algorithm, expected_digest = checksum[0].lower(), checksum[1].strip()
+    
+    offset, length = session.chunk_range(index)
+    data = bytearray()
+    async for part in request.stream():
+        data += part
+        if len(data) > length:
+            raise HTTPException(status_code=413, detail="Chunk larger than expected")
+    if len(data) != length:
+        raise HTTPException(
+            status_code=400, detail=f"Chunk {index} must be {length} bytes, got {len(data)}"
+        )
+    
+    digest = base64.b64encode(hashlib.new(algorithm, data).digest()).decode()
+    if digest != expected_digest:
+        logger.warning(f"Upload {upload_id}: checksum mismatch on chunk {index}")
+        raise HTTPException(status_code=460, detail="Checksum mismatch")
+    
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, storage.write_at, storage.input_path(upload_id, session.filename), offset, data
+        )
+    except StorageError as e:
+        logger.error(f"Upload {upload_id}: storage error | {str(e)}")
+        raise HTTPException(status_code=507, detail=str(e))
+    
+    session = await upload_store.mark_received(upload_id, index, settings.upload_ttl_seconds)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return _upload_status(session)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, _: str = Depends(verify_api_key)) -> dict:
+    upload_store = get_upload_store()
+    session = await upload_store.get(upload_id)
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return _upload_status(session)
+
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, _: str = Depends(verify_api_key)) -> dict:
+    upload_store = get_upload_store()
+    job_store = get_job_store()
+    
+    session = await upload_store.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if not session.complete:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload incomplete", "missing_chunks": session.missing_chunks()},
+        )
+    
+    session = await upload_store.pop(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    job_id = await job_store.create(
+        session.source_format,
+        session.target_formats,
+        session.filename,
+        job_id=upload_id,
+        page_range=session.page_range,
+    )
+    logger.info(
+        f"Job {job_id}: created from upload | file={session.filename} "
+        f"| {session.source_format}->{','.join(session.target_formats)}"
+    )
+    
+    doc_processor = await get_document_processor()
+    queued = doc_processor.submit_conversion(
+        job_id, session.filename, session.source_format, session.target_formats, session.page_range
+    )
+    
+    if not queued:
+        # Keep the uploaded file and hand the session back so the client can
+        # simply retry finalize instead of uploading everything again.
+        await job_store.delete(job_id)
+        await upload_store.restore(session, get_settings().upload_ttl_seconds)
+        logger.warning(f"Job {job_id}: task queue full, upload kept for retry")
+        raise HTTPException(status_code=503, detail="Task queue is full, try again later")
+    
+    return {"job_id": job_id, "status": "PENDING"}
+
+
 @router.get("/jobs/{job_id}")
-async def get_job(job_id: str, _: str = Depends(verify_api_key)) -> dict:
+async def get_job(job_id: str, _: str = Depends(verify_api_key)) -> FastJSONResponse:
     job_store = get_job_store()
     record = await job_store.get(job_id)
     
@@ -69,22 +295,15 @@ async def get_job(job_id: str, _: str = Depends(verify_api_key)) -> dict:
         logger.warning(f"Job {job_id}: not found")
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return {
-        "job_id": record.job_id,
-        "status": record.status.value,
-        "source_format": record.source_format,
-        "target_format": record.target_format,
-        "input_filename": record.input_filename,
-        "output_file": record.output_file,
-        "error": record.error,
-        "created_at": record.created_at.isoformat(),
-        "started_at": record.started_at.isoformat() if record.started_at else None,
-        "completed_at": record.completed_at.isoformat() if record.completed_at else None,
-    }
+    return FastJSONResponse(record.to_json())
 
 
 @router.get("/jobs/{job_id}/download")
-async def download_job(job_id: str, _: str = Depends(verify_api_key)) -> FileResponse:
+async def download_job(
+    job_id: str,
+    format: DocumentFormat = Query(None),
+    _: str = Depends(verify_api_key),
+) -> FileResponse:
     job_store = get_job_store()
     record = await job_store.get(job_id)
     
@@ -96,11 +315,17 @@ async def download_job(job_id: str, _: str = Depends(verify_api_key)) -> FileRes
         logger.warning(f"Job {job_id}: download requested but status is {record.status.value}")
         raise HTTPException(status_code=400, detail="Job has not completed successfully")
     
-    if not record.output_file:
+    output_file = record.output_file
+    if format is not None and format.value != record.target_format:
+        if format.value not in record.target_formats:
+            raise HTTPException(status_code=404, detail=f"Job has no {format.value} output")
+        output_file = (record.output_files or {}).get(format.value)
+    
+    if not output_file:
         logger.error(f"Job {job_id}: output_file not set")
         raise HTTPException(status_code=404, detail="Output file not found")
     
-    output_path = Path(record.output_file)
+    output_path = Path(output_file)
     if not output_path.exists():
         logger.error(f"Job {job_id}: output file missing from disk | {output_path}")
         raise HTTPException(status_code=404, detail="Output file missing on disk")
@@ -119,27 +344,34 @@ async def list_jobs(
     status: str = Query(None),
     limit: int = Query(50, ge=1, le=1000),
     _: str = Depends(verify_api_key),
-) -> dict:
+) -> FastJSONResponse:
     job_store = get_job_store()
     jobs, total = await job_store.list(status, limit)
     
     logger.info(f"Listed jobs | total={total} | status={status or 'all'} | limit={limit}")
     
-    return {
-        "total": total,
-        "jobs": [
-            {
-                "job_id": j.job_id,
-                "status": j.status.value,
-                "source_format": j.source_format,
-                "target_format": j.target_format,
-                "input_filename": j.input_filename,
-                "created_at": j.created_at.isoformat(),
-                "completed_at": j.completed_at.isoformat() if j.completed_at else None,
-            }
-            for j in jobs
-        ],
-    }
+    body = b",".join(j.summary_json() for j in jobs)
+    return FastJSONResponse(
+        b'{"total":' + dumps(total) + b',"jobs":[' + body + b"]}"
+    )
+
+
+@router.get("/admin/loop")
+async def loop_stats(
+    top: int = Query(20, ge=1, le=200),
+    reset: bool = Query(False),
+    _: str = Depends(verify_api_key),
+) -> dict:
+    monitor = get_loop_monitor()
+    stats = monitor.snapshot(top)
+    if reset:
+        monitor.reset()
+    return stats
+
+
+@router.get("/admin/engines")
+async def engine_stats(_: str = Depends(verify_api_key)) -> dict:
+    return {"engines": get_engine_registry().stats()}
 
 
 @router.get("/health")
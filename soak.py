@@ -0,0 +1,236 @@
+"""Long-running soak test for memory and file-descriptor leaks.
+
+Pushes many jobs through the real AsyncTaskProcessor, DocumentProcessor,
+JobStore and StorageManager, with fake converter engines standing in for
+LibreOffice and pdf2docx. Python heap (tracemalloc), RSS and open file
+descriptors are sampled at intervals. After a warm-up period the final
+sample is compared with the baseline; growth over any budget fails the run
+(exit code 1) and the top allocation sites are printed.
+
+    python soak.py --jobs 20000 --rss-budget-mb 32 --fd-budget 16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+import jobs
+import storage
+from engines import FakeEngine, get_engine_registry
+from jobs import JobStatus, JobStore
+from logger import get_logger
+from processor import AsyncTaskProcessor, DocumentProcessor
+from storage import StorageManager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+TERMINAL = (JobStatus.SUCCESS, JobStatus.FAILED)
+
+
+@dataclass
+class Sample:
+    jobs_done: int
+    elapsed: float
+    rss_mb: float | None
+    fds: int | None
+    traced_mb: float
+
+    def __str__(self) -> str:
+        rss = f"{self.rss_mb:.1f}" if self.rss_mb is not None else "n/a"
+        fds = self.fds if self.fds is not None else "n/a"
+        return (
+            f"[{self.elapsed:7.1f}s] jobs={self.jobs_done:<7} rss_mb={rss:<8} "
+            f"fds={fds:<5} traced_mb={self.traced_mb:.2f}"
+        )
+
+
+def _rss_mb() -> float | None:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _open_fds() -> int | None:
+    if os.path.isdir("/proc/self/fd"):
+        return len(os.listdir("/proc/self/fd"))
+    if psutil is not None:
+        process = psutil.Process()
+        return process.num_handles() if os.name == "nt" else process.num_fds()
+    return None
+
+
+def _sample(jobs_done: int, started: float) -> Sample:
+    traced, _ = tracemalloc.get_traced_memory()
+    return Sample(jobs_done, time.monotonic() - started, _rss_mb(), _open_fds(), traced / (1024 * 1024))
+
+
+def _install_fake_engines(latency: float, failure_rate: float) -> None:
+    registry = get_engine_registry()
+    for name in ("soffice", "pdf2docx", "docx2pdf"):
+        registry.unregister(name)
+    registry.register(FakeEngine(
+        "fake-soffice", {("docx", "pdf"), ("docx", "txt")},
+        latency=latency, failure_rate=failure_rate,
+    ))
+    registry.register(FakeEngine(
+        "fake-pdf2docx", {("pdf", "docx")},
+        latency=latency, failure_rate=failure_rate,
+    ))
+
+
+async def soak(args: argparse.Namespace, data_dir: Path) -> bool:
+    jobs._job_store = JobStore(data_dir)
+    storage._storage_manager = StorageManager(data_dir)
+    job_store = jobs.get_job_store()
+    storage_manager = storage.get_storage_manager()
+    _install_fake_engines(args.latency, args.failure_rate)
+
+    task_processor = AsyncTaskProcessor(args.concurrency, args.queue_length)
+    await task_processor.start()
+    doc_processor = DocumentProcessor(task_processor)
+
+    tracemalloc.start(args.frames)
+    started = time.monotonic()
+    baseline: Sample | None = None
+    baseline_snapshot = None
+    done = 0
+    conversions = (("docx", ["pdf"], "docx"), ("pdf", ["docx"], "pdf"), ("docx", ["pdf", "txt"], "docx"))
+
+    async def wait_for_completion() -> list:
+        """Wait for every job to finish; return the ones still running at the deadline."""
+        deadline = time.monotonic() + args.drain_timeout
+        while True:
+            unfinished = [r for r in job_store._jobs.values() if r.status not in TERMINAL]
+            if not unfinished or time.monotonic() > deadline:
+                return unfinished
+            await asyncio.sleep(0.01)
+
+    async def fail_stuck(stuck: list) -> bool:
+        await task_processor.stop()
+        tracemalloc.stop()
+        print(f"\nFAILED: {len(stuck)} jobs did not finish within {args.drain_timeout}s")
+        for record in stuck[:args.top]:
+            print(f"  {record.job_id}  status={record.status.value}  file={record.input_filename}")
+        return False
+
+    for i in range(args.jobs):
+        source, targets, extension = conversions[i % len(conversions)]
+        filename = f"document-{i}.{extension}"
+        job_id = await job_store.create(source, targets, filename)
+        storage_manager.job_dir(job_id).joinpath(filename).write_bytes(b"%soak%")
+        while not doc_processor.submit_conversion(job_id, filename, source, targets):
+            await asyncio.sleep(0.001)
+        done += 1
+
+        if done % args.reap_every == 0:
+            stuck = await wait_for_completion()
+            if stuck:
+                return await fail_stuck(stuck)
+            await purge_expired_jobs_now(job_store, storage_manager)
+
+        if done % args.sample_every == 0:
+            sample = _sample(done, started)
+            print(sample, flush=True)
+            if baseline is None and done >= args.warmup:
+                baseline = sample
+                baseline_snapshot = tracemalloc.take_snapshot()
+
+    stuck = await wait_for_completion()
+    if stuck:
+        return await fail_stuck(stuck)
+    await purge_expired_jobs_now(job_store, storage_manager)
+    await task_processor.stop()
+    final = _sample(done, started)
+    final_snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    print(final)
+
+    if baseline is None:
+        print("Not enough jobs to pass the warm-up period; nothing to compare")
+        return True
+    return _report(args, baseline, final, baseline_snapshot, final_snapshot)
+
+
+async def purge_expired_jobs_now(job_store: JobStore, storage_manager: StorageManager) -> None:
+    # Same reaping the server's GC loop does, but with a zero TTL so the store
+    # size stays flat and any growth left over is a genuine leak.
+    loop = asyncio.get_running_loop()
+    for job_id in await job_store.cleanup_expired(0):
+        await loop.run_in_executor(None, storage_manager.cleanup_job, job_id)
+
+
+def _report(args, baseline: Sample, final: Sample, before, after) -> bool:
+    failures = []
+    traced_growth = final.traced_mb - baseline.traced_mb
+    print(f"\nGrowth since warm-up ({final.jobs_done - baseline.jobs_done} jobs):")
+    print(f"  traced python heap: {traced_growth:+.2f} MB (budget {args.heap_budget_mb} MB)")
+    if traced_growth > args.heap_budget_mb:
+        failures.append("python heap")
+
+    if baseline.rss_mb is not None and final.rss_mb is not None:
+        rss_growth = final.rss_mb - baseline.rss_mb
+        print(f"  rss:                {rss_growth:+.2f} MB (budget {args.rss_budget_mb} MB)")
+        if rss_growth > args.rss_budget_mb:
+            failures.append("rss")
+
+    if baseline.fds is not None and final.fds is not None:
+        fd_growth = final.fds - baseline.fds
+        print(f"  open fds:           {fd_growth:+d} (budget {args.fd_budget})")
+        if fd_growth > args.fd_budget:
+            failures.append("file descriptors")
+
+    key_type = "traceback" if args.frames > 1 else "lineno"
+    print(f"\nTop {args.top} allocation sites by growth:")
+    growth = [stat for stat in after.compare_to(before, key_type) if stat.size_diff > 0]
+    growth.sort(key=lambda stat: stat.size_diff, reverse=True)
+    for stat in growth[:args.top]:
+        print(f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  {stat.traceback[-1]}")
+        for line in stat.traceback.format()[:-2] if args.frames > 1 else []:
+            print(f"      {line.strip()}")
+
+    if failures:
+        print(f"\nFAILED: growth over budget for {', '.join(failures)}")
+        return False
+    print("\nPASSED")
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=2000, help="jobs to run before taking the baseline")
+    parser.add_argument("--sample-every", type=int, default=1000)
+    parser.add_argument("--reap-every", type=int, default=100, help="jobs between reaping finished jobs")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--queue-length", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake conversion time in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--drain-timeout", type=float, default=60,
+                        help="seconds to wait for in-flight jobs before failing the run")
+    parser.add_argument("--heap-budget-mb", type=float, default=8)
+    parser.add_argument("--rss-budget-mb", type=float, default=32)
+    parser.add_argument("--fd-budget", type=int, default=16)
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc frames per allocation")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    get_logger().setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory(prefix="docustream-soak-") as data_dir:
+        passed = asyncio.run(soak(args, Path(data_dir)))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Export one document to several formats from a single LibreOffice load.
+
+Runs under a Python interpreter that can ``import uno`` (the one bundled with
+LibreOffice, or a system Python with the UNO bridge installed), so it must not
+import anything from this project:
+
+    python soffice_export.py <soffice> <input file> <spec.json> [<profile dir>]
+
+Without a profile directory a throwaway one is used. ``spec.json`` holds a list of ``{"path", "filter", "filter_data", "filter_options"}``
+entries, one per output file.
+"""
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import nullcontext
+from pathlib import Path
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+CONNECT_TIMEOUT_SECONDS = 60
+
+
+def _properties(**values) -> tuple:
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+def _connect(pipe_name: str, process: subprocess.Popen):
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_ctx
+    )
+    deadline = time.monotonic() + CONNECT_TIMEOUT_SECONDS
+    while True:
+        try:
+            ctx = resolver.resolve(f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext")
+            return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        except NoConnectException:
+            if process.poll() is not None:
+                raise RuntimeError(f"soffice exited with code {process.returncode}")
+            if time.monotonic() > deadline:
+                raise RuntimeError("Timed out connecting to soffice")
+            time.sleep(0.2)
+
+
+def _export(desktop, input_path: Path, spec: list[dict]) -> None:
+    document = desktop.loadComponentFromURL(
+        input_path.resolve().as_uri(), "_blank", 0, _properties(Hidden=True, ReadOnly=True)
+    )
+    if document is None:
+        raise RuntimeError(f"LibreOffice could not load {input_path.name}")
+
+    try:
+        for target in spec:
+            args = {"FilterName": target["filter"], "Overwrite": True}
+            if target.get("filter_data"):
+                args["FilterData"] = uno.Any(
+                    "[]com.sun.star.beans.PropertyValue",
+                    _properties(**target["filter_data"]),
+                )
+            if target.get("filter_options"):
+                args["FilterOptions"] = target["filter_options"]
+            document.storeToURL(Path(target["path"]).resolve().as_uri(), _properties(**args))
+    finally:
+        document.close(True)
+
+
+def main(argv: list[str]) -> int:
+    soffice, input_file, spec_file = argv[1:4]
+    spec = json.loads(Path(spec_file).read_text(encoding="utf-8"))
+    pipe_name = f"docustream_{uuid.uuid4().hex}"
+    profile = nullcontext(argv[4]) if len(argv) > 4 else tempfile.TemporaryDirectory()
+
+    with profile as profile_dir:
+        process = subprocess.Popen(
+            [
+                soffice,
+                "--headless",
+                "--invisible",
+                "--norestore",
+                "--nologo",
+                "--nodefault",
+                f"-env:UserInstallation={Path(profile_dir).as_uri()}",
+                f"--accept=pipe,name={pipe_name};urp;",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            desktop = _connect(pipe_name, process)
+            _export(desktop, Path(input_file), spec)
+            try:
+                desktop.terminate()
+            except Exception:
+                pass
+            process.wait(timeout=30)
+        except Exception as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
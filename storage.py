@@ -1,24 +1,158 @@
+import hashlib
+import os
+import re
 import shutil
+import tempfile
+import time
+import uuid
 from pathlib import Path
 from aiofiles import open as aopen
 from config import get_settings
 from exceptions import StorageError
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SCRATCH_SUBDIR = "docustream"
+SCRATCH_STALE_SECONDS = 6 * 3600
+# <job_id>.<pid>-<mkdtemp suffix>
+_SCRATCH_NAME = re.compile(r"^.+\.(\d+)-[a-z0-9_]{8}$")
+
+
+def _pid_alive(pid: int) -> bool:
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == "nt":
+        # os.kill() would terminate the process on Windows; rely on age instead.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
 
 class StorageManager:
-    def __init__(self, base_dir: Path):
+    """Job files live under ``base_dir/jobs/<aa>/<bb>/<job_id>``.
+
+    The two shard levels come from a hash of the job ID, which keeps every
+    directory small no matter how many jobs are retained. Scratch space lives
+    in its own ``docustream`` subdirectory so a shared location such as
+    ``/dev/shm`` can be used safely.
+    """
+    
+    def __init__(self, base_dir: Path, scratch_dir: Path | None = None):
         self.base_dir = Path(base_dir)
+        self.jobs_root = self.base_dir / "jobs"
+        scratch_base = Path(scratch_dir) if scratch_dir else self.base_dir / "scratch"
+        self.scratch_root = scratch_base / SCRATCH_SUBDIR
+    
+    def _job_path(self, job_id: str) -> Path:
+        digest = hashlib.sha1(job_id.encode("utf-8")).hexdigest()
+        return self.jobs_root / digest[:2] / digest[2:4] / job_id
     
     def job_dir(self, job_id: str) -> Path:
-        job_path = self.base_dir / job_id
+        job_path = self._job_path(job_id)
         job_path.mkdir(parents=True, exist_ok=True)
         return job_path
     
     def output_dir(self, job_id: str) -> Path:
-        output_path = self.base_dir / job_id / "output"
+        output_path = self._job_path(job_id) / "output"
         output_path.mkdir(parents=True, exist_ok=True)
         return output_path
     
+    def scratch_dir(self, job_id: str) -> Path:
+        """Create a private working directory for one conversion run."""
+        self.scratch_root.mkdir(parents=True, exist_ok=True)
+        return Path(
+            tempfile.mkdtemp(prefix=f"{job_id}.{os.getpid()}-", dir=self.scratch_root)
+        )
+    
+    def discard_scratch(self, scratch_path: Path) -> None:
+        shutil.rmtree(scratch_path, ignore_errors=True)
+    
+    def purge_scratch(self, max_age_seconds: float = SCRATCH_STALE_SECONDS) -> int:
+        """Remove working directories left behind by interrupted processes.
+
+        Meant to run at startup. Only directories created by ``scratch_dir``
+        are touched, and only when the process that created them is gone (or
+        is this one, restarted under the same PID) or they are older than
+        ``max_age_seconds``. Other workers' in-flight conversions are kept.
+        """
+        if not self.scratch_root.exists():
+            return 0
+        
+        removed = 0
+        now = time.time()
+        for entry in self.scratch_root.iterdir():
+            match = _SCRATCH_NAME.match(entry.name)
+            if not match or not entry.is_dir():
+                continue
+            pid = int(match.group(1))
+            try:
+                stale = now - entry.stat().st_mtime > max_age_seconds
+            except OSError:
+                continue
+            if pid == os.getpid() or stale or not _pid_alive(pid):
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
+    
+    def commit_outputs(
+        self, scratch_files: dict[str, Path], output_dir: Path
+    ) -> dict[str, Path]:
+        """Move finished outputs from scratch space into ``output_dir``.
+
+        A rename is used when both live on the same filesystem; otherwise the
+        file is copied next to its destination and renamed into place, so
+        readers never see a partially written output.
+        """
+        committed = {}
+        try:
+            for key, scratch_file in scratch_files.items():
+                destination = output_dir / scratch_file.name
+                try:
+                    os.replace(scratch_file, destination)
+                except OSError:
+                    partial = destination.with_name(f".{destination.name}.partial")
+                    shutil.copyfile(scratch_file, partial)
+                    os.replace(partial, destination)
+                committed[key] = destination
+        except OSError as e:
+            raise StorageError(f"Failed to store conversion output: {str(e)}") from e
+        return committed
+    
+    def migrate_flat_layout(self) -> tuple[list[str], list[str]]:
+        """Move job directories from the old flat ``base_dir/<job_id>`` layout.
+
+        Returns ``(moved, skipped)`` job IDs; a directory is skipped when its
+        sharded destination already exists and is left in place for review.
+        """
+        moved, skipped = [], []
+        if not self.base_dir.exists():
+            return moved, skipped
+        
+        for entry in self.base_dir.iterdir():
+            try:
+                uuid.UUID(entry.name)
+            except ValueError:
+                continue
+            if not entry.is_dir():
+                continue
+            
+            new_path = self._job_path(entry.name)
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            if new_path.exists():
+                skipped.append(entry.name)
+                continue
+            os.replace(entry, new_path)
+            moved.append(entry.name)
+        return moved, skipped
+    
     async def save_upload(
         self, job_id: str, filename: str, file_obj
     ) -> Path:
@@ -49,11 +183,51 @@ class StorageManager:
         
         return input_path
     
+    def preallocate(self, path: Path, size: int) -> None:
+        """Reserve ``size`` bytes for ``path`` so chunks can be written in place."""
+        try:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        except OSError as e:
+            raise StorageError(f"Failed to allocate upload file: {str(e)}") from e
+        try:
+            if size and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                    return
+                except OSError:
+                    pass
+            os.ftruncate(fd, size)
+        except OSError as e:
+            raise StorageError(f"Failed to allocate upload file: {str(e)}") from e
+        finally:
+            os.close(fd)
+    
+    def write_at(self, path: Path, offset: int, data: bytes) -> None:
+        """Write ``data`` at ``offset`` without touching any shared file position."""
+        try:
+            fd = os.open(path, os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        except OSError as e:
+            raise StorageError(f"Failed to write upload chunk: {str(e)}") from e
+        try:
+            view = memoryview(data)
+            while view:
+                if hasattr(os, "pwrite"):
+                    written = os.pwrite(fd, view, offset)
+                else:
+                    os.lseek(fd, offset, os.SEEK_SET)
+                    written = os.write(fd, view)
+                view = view[written:]
+                offset += written
+        except OSError as e:
+            raise StorageError(f"Failed to write upload chunk: {str(e)}") from e
+        finally:
+            os.close(fd)
+    
     def input_path(self, job_id: str, filename: str) -> Path:
-        return self.base_dir / job_id / filename
+        return self._job_path(job_id) / filename
     
     def cleanup_job(self, job_id: str) -> None:
-        job_path = self.base_dir / job_id
+        job_path = self._job_path(job_id)
         if job_path.exists():
             shutil.rmtree(job_path, ignore_errors=True)
 
@@ -65,5 +239,5 @@ def get_storage_manager() -> StorageManager:
     global _storage_manager
     if _storage_manager is None:
         settings = get_settings()
-        _storage_manager = StorageManager(settings.storage_path)
+        _storage_manager = StorageManager(settings.storage_path, settings.scratch_path)
     return _storage_manager
@@ -0,0 +1,201 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+from config import get_settings
+from encoding import dumps, loads
+from logger import get_logger
+from storage import get_storage_manager
+
+logger = get_logger()
+
+
+@dataclass
+class UploadSession:
+    upload_id: str
+    filename: str
+    source_format: str
+    target_formats: list[str]
+    size: int
+    chunk_size: int
+    created_at: float
+    expires_at: float
+    received: set[int] = field(default_factory=set)
+    page_range: Optional[str] = None
+
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.size // self.chunk_size)
+
+    def chunk_range(self, index: int) -> tuple[int, int]:
+        """Return ``(offset, length)`` of chunk ``index``."""
+        offset = index * self.chunk_size
+        return offset, min(self.chunk_size, self.size - offset)
+
+    @property
+    def offset(self) -> int:
+        """Number of contiguous bytes received from the start of the file."""
+        index = 0
+        while index in self.received:
+            index += 1
+        return min(index * self.chunk_size, self.size)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.received) == self.chunk_count
+
+    def missing_chunks(self) -> list[int]:
+        return [i for i in range(self.chunk_count) if i not in self.received]
+
+    def to_dict(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "source_format": self.source_format,
+            "target_formats": self.target_formats,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "created_at": self.created_at,
+            "expires_at": self.expires_at,
+            "received": sorted(self.received),
+            "page_range": self.page_range,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "UploadSession":
+        data = data.copy()
+        data["received"] = set(data["received"])
+        return cls(**data)
+
+
+class UploadStore:
+    def __init__(self, storage_dir: Path):
+        self.storage_dir = Path(storage_dir)
+        self._sessions: dict[str, UploadSession] = {}
+        self._lock = asyncio.Lock()
+        self._sessions_file = self.storage_dir / "uploads.json"
+
+    async def load(self) -> None:
+        async with self._lock:
+            if self._sessions_file.exists():
+                try:
+                    with open(self._sessions_file, "rb") as f:
+                        data = loads(f.read())
+                    self._sessions = {
+                        upload_id: UploadSession.from_dict(record)
+                        for upload_id, record in data.items()
+                    }
+                except Exception:
+                    self._sessions = {}
+
+    async def _persist(self) -> None:
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        data = {
+            upload_id: session.to_dict()
+            for upload_id, session in self._sessions.items()
+        }
+        with open(self._sessions_file, "wb") as f:
+            f.write(dumps(data))
+
+    async def create(
+        self,
+        filename: str,
+        source_format: str,
+        target_formats: list[str],
+        size: int,
+        chunk_size: int,
+        ttl_seconds: int,
+        page_range: Optional[str] = None,
+    ) -> UploadSession:
+        async with self._lock:
+            now = time.time()
+            session = UploadSession(
+                upload_id=str(uuid.uuid4()),
+                filename=filename,
+                source_format=source_format,
+                target_formats=target_formats,
+                size=size,
+                chunk_size=chunk_size,
+                created_at=now,
+                expires_at=now + ttl_seconds,
+                page_range=page_range,
+            )
+            self._sessions[session.upload_id] = session
+            await self._persist()
+            return session
+
+    async def get(self, upload_id: str) -> Optional[UploadSession]:
+        async with self._lock:
+            session = self._sessions.get(upload_id)
+            if session and session.expires_at < time.time():
+                return None
+            return session
+
+    async def mark_received(
+        self, upload_id: str, index: int, ttl_seconds: int
+    ) -> Optional[UploadSession]:
+        async with self._lock:
+            session = self._sessions.get(upload_id)
+            if not session:
+                return None
+            session.received.add(index)
+            session.expires_at = time.time() + ttl_seconds
+            await self._persist()
+            return session
+
+    async def pop(self, upload_id: str) -> Optional[UploadSession]:
+        async with self._lock:
+            session = self._sessions.pop(upload_id, None)
+            if session:
+                await self._persist()
+            return session
+
+    async def restore(self, session: UploadSession, ttl_seconds: int) -> None:
+        """Put back a popped session, e.g. when its job could not be queued."""
+        async with self._lock:
+            session.expires_at = time.time() + ttl_seconds
+            self._sessions[session.upload_id] = session
+            await self._persist()
+    
+    async def cleanup_expired(self) -> list[str]:
+        async with self._lock:
+            now = time.time()
+            expired = [
+                upload_id
+                for upload_id, session in self._sessions.items()
+                if session.expires_at < now
+            ]
+
+            for upload_id in expired:
+                del self._sessions[upload_id]
+
+            if expired:
+                await self._persist()
+
+            return expired
+
+
+_upload_store: UploadStore | None = None
+
+
+def get_upload_store() -> UploadStore:
+    global _upload_store
+    if _upload_store is None:
+        settings = get_settings()
+        _upload_store = UploadStore(settings.storage_path)
+    return _upload_store
+
+
+async def purge_expired_uploads() -> int:
+    """Drop expired upload sessions together with their partial files."""
+    upload_store = get_upload_store()
+    storage = get_storage_manager()
+
+    expired = await upload_store.cleanup_expired()
+    loop = asyncio.get_running_loop()
+    for upload_id in expired:
+        await loop.run_in_executor(None, storage.cleanup_job, upload_id)
+        logger.info(f"Upload {upload_id}: expired and removed")
+    return len(expired)